@@ -1,8 +1,19 @@
 from flask import Flask, render_template, redirect, url_for
 # UPDATED: Import extensions from the separate file to allow access in other blueprints
 from extensions import db, bcrypt, login_manager, cache 
-from models import User
+from search import rebuild_search_index
+from cache_backends import cache_config
+import database
+import routing
+from indexes import create_missing_indexes
+import migrations
+from images import is_processed, image_url, image_srcset
+import assets
+import instrumentation
+import conditional
+import user_context
 import os
+import click
 from dotenv import load_dotenv
 from flask_login import current_user
 
@@ -10,29 +21,51 @@ load_dotenv()
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///bobcat.db')
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-# --- NEW: Cache Configuration ---
-# Configures Flask to use simple memory caching for the club dashboards
-app.config['CACHE_TYPE'] = 'SimpleCache' 
-app.config['CACHE_DEFAULT_TIMEOUT'] = 300
+# --- Database Configuration ---
+# DATABASE_URL picks the database; SQLite gets WAL and busy_timeout PRAGMAs,
+# PostgreSQL a tuned connection pool, and DATABASE_REPLICA_URLS adds read
+# replicas (see database.py) that GET requests read from (see routing.py)
+app.config.update(database.engine_config(os.getenv('DATABASE_URL'), os.getenv('DATABASE_REPLICA_URLS', '')))
+app.config['DB_STICKY_SECONDS'] = float(os.getenv('DB_STICKY_SECONDS', routing.STICKY_SECONDS))
+
+# --- Cache Configuration ---
+# CACHE_URL picks the backend (see cache_backends.py). The default SimpleCache is
+# per process; use shm://, file:// or redis:// when running several workers.
+app.config.update(cache_config(os.getenv('CACHE_URL', 'simple://')))
+app.config['CACHE_DEFAULT_TIMEOUT'] = int(os.getenv('CACHE_DEFAULT_TIMEOUT', 300))
 
 # --- UPDATED: Initialize Extensions ---
 # Connects the extensions (created in extensions.py) to this specific app instance
 db.init_app(app)
+database.init_app(app)  # SQLite PRAGMAs on every new connection
+routing.init_app(app)  # read-your-writes stickiness for replica reads
 bcrypt.init_app(app)
 login_manager.init_app(app)
 cache.init_app(app)  # <--- FIX: This line solves the "no attribute 'app'" error
+assets.init_app(app)  # /assets/ URLs with content hashes, cached as immutable
+conditional.init_app(app)  # ETag / Last-Modified on pages that support conditional GET
+
+# --- Instrumentation ---
+# Query counts and timings per request: Server-Timing headers, a JSON log line
+# per request and /metrics (see instrumentation.py)
+app.config['SERVER_TIMING'] = os.getenv('SERVER_TIMING', '1') == '1'
+app.config['REQUEST_LOG_LEVEL'] = os.getenv('REQUEST_LOG_LEVEL', 'INFO')
+instrumentation.init_app(app)
 
 # Login Manager Setup
 login_manager.login_view = 'auth.login'
 login_manager.login_message = 'Please login to access this page.'
 login_manager.login_message_category = 'info'
 
+# Responsive image helpers for templates/base/_image.html
+app.jinja_env.globals.update(is_processed=is_processed, image_url=image_url, image_srcset=image_srcset)
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    # Served from the cached user context (see user_context.py), not a query per request
+    return user_context.load_user(int(user_id))
 
 # Register blueprints
 from blueprints.auth import auth
@@ -55,6 +88,243 @@ try:
 except ImportError:
     pass
 
+# --- CLI Commands ---
+
+@app.cli.command('reconcile-counters')
+def reconcile_counters_command():
+    """Repairs drift in the like, RSVP and follower counters."""
+    from counters import reconcile
+    repaired = reconcile()
+    print(f"Reconciled counters ({repaired} rows repaired).")
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Re-indexes every post for full-text search."""
+    with db.engine.begin() as connection:
+        rebuild_search_index(connection)
+    print("Search index rebuilt.")
+
+@app.cli.command('rebuild-timelines')
+def rebuild_timelines_command():
+    """Recomputes every following-feed timeline from posts and follows."""
+    from timeline import rebuild_timelines
+    with db.engine.begin() as connection:
+        entries = rebuild_timelines(connection)
+    cache.clear()
+    print(f"Timelines rebuilt ({entries} entries).")
+
+@app.cli.group('db')
+def db_command():
+    """Database schema migrations and engine checks."""
+
+@db_command.command('upgrade')
+def db_upgrade_command():
+    """Applies pending schema migrations."""
+    applied = migrations.upgrade(db.engine)
+    if applied:
+        cache.clear()  # cached pages were built against the old schema
+    print(f"Database at version {migrations.current_version(db.engine)} ({len(applied)} migrations applied).")
+
+@db_command.command('status')
+def db_status_command():
+    """Shows the schema version and any pending migrations."""
+    print(f"Database at version {migrations.current_version(db.engine)}.")
+    for version, description, _ in migrations.pending(db.engine):
+        print(f"   pending {version}: {description}")
+
+@db_command.command('stress')
+@click.option('--threads', default=8, show_default=True)
+@click.option('--seconds', default=5.0, show_default=True, help='Duration of each run.')
+@click.option('--write-ratio', default=0.2, show_default=True, help='Share of operations that write.')
+def db_stress_command(threads, seconds, write_ratio):
+    """Compares default and tuned SQLite settings under concurrent readers and writers."""
+    print(f"{threads} threads, {write_ratio:.0%} writes, {seconds:g}s per run on a scratch database.")
+    for label, pragmas in (('sqlite defaults', None), ('tuned (database.py)', database.SQLITE_PRAGMAS)):
+        result = database.stress(pragmas, threads, seconds, write_ratio)
+        print(f"   {label:<22}{result['ops_per_second']:>9,.0f} ops/s   p99 {result['p99_ms']:>8.1f} ms"
+              f"   {result['locked']} locked")
+
+@app.cli.command('create-indexes')
+def create_indexes_command():
+    """Adds indexes declared in models.py to an existing database."""
+    created = create_missing_indexes(db.engine)
+    print(f"Created {len(created)} indexes: {', '.join(created) or 'none needed'}")
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fails if any hot query is planned as a full table scan."""
+    from indexes import check_query_plans
+    with db.engine.begin() as connection:
+        regressions = check_query_plans(connection)
+    for label, plan in regressions.items():
+        print(f"   ! {label}:")
+        for line in plan:
+            print(f"       {line}")
+    if regressions:
+        raise SystemExit(f"{len(regressions)} hot queries use table scans.")
+    print("All hot queries use indexes.")
+
+@app.cli.command('process-images')
+def process_images_command():
+    """Runs existing post and club pictures through the image pipeline."""
+    from images import process_image, InvalidImage
+    from models import Club, Post
+    from caching import invalidate, CLUBS_TAG
+
+    upload_dir = os.path.join(app.root_path, 'static', 'posts')
+    converted = 0
+    for row in Post.query.all() + Club.query.all():
+        path = os.path.join(upload_dir, row.image_file or '')
+        if is_processed(row.image_file) or not os.path.isfile(path):
+            continue
+        with open(path, 'rb') as f:
+            try:
+                row.image_file = process_image(f.read(), app.root_path)
+                converted += 1
+            except InvalidImage as e:
+                print(f"   ! {path}: {e}")
+    db.session.commit()
+    invalidate(CLUBS_TAG)
+    print(f"Processed {converted} images.")
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Precompresses CSS/JS under static/ so /assets/ can serve .br/.gz copies."""
+    written = assets.build_compressed(app.static_folder)
+    print(f"Wrote {len(written)} compressed files{'' if assets.brotli else ' (gzip only; install brotli for .br)'}.")
+
+@app.cli.group('jobs')
+def jobs_command():
+    """Background job queue (see jobs.py)."""
+
+@jobs_command.command('work')
+@click.option('--threads', default=1, show_default=True, help='Worker threads in this process.')
+@click.option('--burst', is_flag=True, help='Exit once the queue is empty.')
+def jobs_work_command(threads, burst):
+    """Runs queued jobs until stopped."""
+    import threading
+    import jobs
+
+    def worker():
+        with app.app_context():
+            processed = jobs.work(burst=burst)
+            print(f"Worker finished ({processed} jobs).")
+
+    jobs.schedule_periodic()
+    print(f"Starting {threads} worker thread(s).")
+    pool = [threading.Thread(target=worker, daemon=True) for _ in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+@jobs_command.command('status')
+def jobs_status_command():
+    """Shows queued, running and dead job counts."""
+    from models import Job, DeadJob
+    for status, count in db.session.query(Job.status, db.func.count()).group_by(Job.status):
+        print(f"   {status}: {count}")
+    print(f"   dead: {DeadJob.query.count()}")
+
+@jobs_command.command('retry-dead')
+def jobs_retry_dead_command():
+    """Requeues every job in the dead-letter table."""
+    from jobs import retry_dead
+    print(f"Requeued {retry_dead()} dead jobs.")
+
+@app.cli.command('import')
+@click.argument('kind', type=click.Choice(['clubs', 'users', 'posts', 'likes', 'rsvps', 'follows']))
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--batch-size', default=1000, show_default=True)
+@click.option('--update', is_flag=True, help='clubs: update rows whose name already exists.')
+def import_command(kind, path, batch_size, update):
+    """Bulk-loads a CSV or JSONL file (see bulk_import.py)."""
+    import bulk_import
+    from counters import backfill
+    from models import PostLike, RSVP, ClubFollower
+
+    records = bulk_import.read_records(path)
+    if kind == 'clubs':
+        stats = bulk_import.import_clubs(db.engine, records, batch_size, update_existing=update)
+    elif kind == 'users':
+        stats = bulk_import.import_users(db.engine, records, batch_size)
+    elif kind == 'posts':
+        stats = bulk_import.import_posts(db.engine, records, batch_size)
+    else:
+        model = {'likes': PostLike, 'rsvps': RSVP, 'follows': ClubFollower}[kind]
+        stats = bulk_import.import_links(db.engine, model, records, batch_size)
+        backfill(db.engine)
+    if kind in ('posts', 'follows'):
+        from timeline import rebuild_timelines
+        with db.engine.begin() as connection:
+            rebuild_timelines(connection)
+    cache.clear()  # imported rows can show up on any cached page
+    print(stats)
+
+@app.cli.command('generate-data')
+@click.option('--scale', type=click.Choice(['small', 'medium', 'campus']), default='small', show_default=True)
+@click.option('--seed', default=0, show_default=True, help='Random seed; the same seed builds the same dataset.')
+@click.option('--reset', is_flag=True, help='Drop every table and migrate from scratch first.')
+def generate_data_command(scale, seed, reset):
+    """Fills the database with a synthetic campus-sized dataset (see synthetic.py)."""
+    import synthetic
+    if reset:
+        db.drop_all()
+    migrations.upgrade(db.engine)
+    print(f"Generating the {scale} dataset: " + ', '.join(f"{count:,} {name}" for name, count in synthetic.SCALES[scale].items()))
+    synthetic.generate(db.engine, synthetic.SCALES[scale], seed=seed)
+    cache.clear()
+    print("Done.")
+
+@app.cli.command('benchmark')
+@click.option('--requests', 'count', default=50, show_default=True, help='Timed requests per endpoint.')
+@click.option('--warmup', default=5, show_default=True, help='Untimed requests per endpoint first.')
+@click.option('--cold', is_flag=True, help='Clear the cache before every request.')
+@click.option('--save', 'save_path', type=click.Path(dir_okay=False), help='Write the results as JSON.')
+@click.option('--baseline', type=click.Path(exists=True, dir_okay=False), help='Compare against saved results.')
+def benchmark_command(count, warmup, cold, save_path, baseline):
+    """Reports latency percentiles and query counts for the busiest pages."""
+    import benchmark
+    results = benchmark.run_benchmark(app, requests=count, warmup=warmup, cold=cold)
+    print(benchmark.format_results(results))
+    if save_path:
+        benchmark.save(results, save_path)
+    if baseline:
+        found = benchmark.regressions(results, benchmark.load(baseline))
+        for line in found:
+            print(f"   ! {line}")
+        if found:
+            raise SystemExit(f"{len(found)} regressions against {baseline}.")
+        print(f"No regressions against {baseline}.")
+
+@app.cli.command('check-cache')
+@click.option('--fake-redis', is_flag=True, help='Check the Redis backend against an in-process fake server.')
+def check_cache_command(fake_redis):
+    """Checks that the configured cache backend supports what caching.py needs."""
+    from cache_backends import check_backend
+    from flask_caching import Cache
+
+    server = None
+    config = None
+    if fake_redis:
+        from fake_redis import FakeRedisServer
+        server = FakeRedisServer().start()
+        config = cache_config(server.url)
+
+    try:
+        target = Cache(app, config=config) if config else cache
+        failures = check_backend(target)
+    finally:
+        if server:
+            server.stop()
+
+    backend = (config or app.config)['CACHE_TYPE']
+    if failures:
+        for failure in failures:
+            print(f"   ! {failure}")
+        raise SystemExit(f"{backend} failed {len(failures)} cache checks.")
+    print(f"{backend} passed all cache checks.")
+
 @app.route('/')
 def index():
     if current_user.is_authenticated:
@@ -67,10 +337,9 @@ def index():
             return redirect(url_for('admin.dashboard'))
     return render_template('index.html')
 
-# Create database tables
-with app.app_context():
-    db.create_all()
-    print("Database tables created!")
+# Schema changes run through `flask db upgrade` (see migrations.py), never at import time
 
 if __name__ == '__main__':
+    with app.app_context():
+        migrations.upgrade(db.engine)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,130 @@
+# assets.py
+# Immutable, content-addressed URLs for everything under static/.
+# asset_url() puts a hash of the file's contents into its name:
+#
+#   asset_url('css/style.css')          -> /assets/css/style.3f9a1c2b7d.css
+#   asset_url('posts/birds.jpg')        -> /assets/posts/birds.0b1e44c9a2.jpg
+#   asset_url('posts/img_<hash>_feed.jpg') -> /assets/posts/img_<hash>_feed.jpg
+#
+# A changed file gets a new URL, so /assets/ responses can be cached for a year
+# with Cache-Control: immutable and browsers never revalidate them. Processed
+# images (see images.py) are already named after their content and keep their name.
+#
+# `flask build-assets` writes .gz (and .br when the brotli package is installed)
+# next to CSS and JS files; clients that accept them get the smaller copy.
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from flask import abort, current_app, redirect, request, send_file, url_for
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # optional: only .gz files are built without it
+    brotli = None
+
+ONE_YEAR = 365 * 24 * 3600
+HASH_LENGTH = 10
+COMPRESSIBLE = ('.css', '.js', '.svg')
+
+# Variants written by images.process_image: the name already is a content hash
+CONTENT_ADDRESSED = re.compile(r'^posts/img_[0-9a-f]{20}_\w+\.\w+$')
+FINGERPRINTED = re.compile(r'^(?P<stem>.+)\.(?P<digest>[0-9a-f]{%d})(?P<ext>\.\w+)$' % HASH_LENGTH)
+
+_digests = {}  # path -> (mtime_ns, size, digest)
+
+def file_digest(path):
+    """Short content hash of a file, recomputed only when the file changes."""
+    stat = os.stat(path)
+    cached = _digests.get(path)
+    if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+    with open(path, 'rb') as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:HASH_LENGTH]
+    _digests[path] = (stat.st_mtime_ns, stat.st_size, digest)
+    return digest
+
+def fingerprinted_name(static_folder, filename):
+    if CONTENT_ADDRESSED.match(filename):
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f'{stem}.{file_digest(os.path.join(static_folder, filename))}{ext}'
+
+def asset_url(filename):
+    """URL of a static file that changes whenever its contents do.
+
+    Falls back to the plain /static/ URL for files that are missing on disk.
+    """
+    try:
+        name = fingerprinted_name(current_app.static_folder, filename)
+    except OSError:
+        return url_for('static', filename=filename)
+    return url_for('serve_asset', filename=name)
+
+# --- Serving ---
+
+def serve_asset(filename):
+    static_folder = current_app.static_folder
+
+    if CONTENT_ADDRESSED.match(filename):
+        source = filename
+    else:
+        match = FINGERPRINTED.match(filename)
+        if not match:
+            abort(404)
+        source = match['stem'] + match['ext']
+    path = safe_join(static_folder, source)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    if source != filename and match['digest'] != file_digest(path):
+        # An old URL: point at the current contents rather than caching them under it
+        return redirect(url_for('serve_asset', filename=fingerprinted_name(static_folder, source)))
+
+    response = _send_precompressed(path) or send_file(path, conditional=True)
+    response.headers['Cache-Control'] = f'public, max-age={ONE_YEAR}, immutable'
+    return response
+
+def _send_precompressed(path):
+    """Sends path.br or path.gz when the client accepts it and the copy is current."""
+    if not path.endswith(COMPRESSIBLE):
+        return None
+    source_mtime = os.stat(path).st_mtime
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        compressed = path + suffix
+        if (encoding in request.accept_encodings and os.path.isfile(compressed)
+                and os.stat(compressed).st_mtime >= source_mtime):
+            mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+            response = send_file(compressed, mimetype=mimetype, conditional=True)
+            response.headers['Content-Encoding'] = encoding
+            response.headers['Vary'] = 'Accept-Encoding'
+            return response
+    return None
+
+def init_app(app):
+    """Registers /assets/<filename> and the asset_url() template global."""
+    app.add_url_rule('/assets/<path:filename>', 'serve_asset', serve_asset)
+    app.jinja_env.globals['asset_url'] = asset_url
+
+# --- Precompression ---
+
+def build_compressed(static_folder):
+    """Writes .gz (and .br if available) copies of every CSS/JS/SVG file. Returns the paths written."""
+    written = []
+    for directory, _, files in os.walk(static_folder):
+        for name in files:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            outputs = {'.gz': gzip.compress(data, compresslevel=9, mtime=0)}
+            if brotli is not None:
+                outputs['.br'] = brotli.compress(data, quality=11)
+            for suffix, content in outputs.items():
+                with open(path + suffix, 'wb') as f:
+                    f.write(content)
+                written.append(path + suffix)
+    return written
@@ -0,0 +1,141 @@
+# benchmark.py
+# Latency and query-count benchmark for the busiest pages (`flask benchmark`).
+# Each endpoint is requested through the Flask test client as a realistic user:
+# the student following the most clubs, the owner of the most-followed club,
+# and an admin. Run it against a `flask generate-data` database:
+#
+#   flask generate-data --scale campus --reset
+#   flask benchmark --requests 200 --save before.json
+#   ... change code ...
+#   flask benchmark --requests 200 --baseline before.json
+#
+# With --baseline, endpoints whose p90 latency grew by more than
+# LATENCY_TOLERANCE or that run more queries than before are reported as
+# regressions and the command exits non-zero.
+import contextvars
+import json
+import logging
+import math
+import time
+from sqlalchemy import event, func
+from extensions import db, cache
+from models import Club, User, ClubFollower
+
+LATENCY_TOLERANCE = 0.25  # 25% slower p90 counts as a regression
+PERCENTILES = (50, 90, 99)
+
+def benchmark_users():
+    """Picks the user each endpoint is requested as, plus the club page to load."""
+    student_id = db.session.query(ClubFollower.user_id).join(User, User.id == ClubFollower.user_id) \
+        .filter(User.role == 'student').group_by(ClubFollower.user_id) \
+        .order_by(func.count().desc()).limit(1).scalar()
+    club = Club.query.filter(Club.verified == True).order_by(Club.follower_count.desc()).first()
+    owner = Club.query.filter(Club.owner_id != None, Club.officer_verified == True) \
+        .order_by(Club.follower_count.desc()).first()
+    admin = User.query.filter_by(role='admin').first()
+    return {
+        'student': student_id,
+        'club': owner.owner_id if owner else None,
+        'admin': admin.id if admin else None,
+        'club_slug': club.slug if club else None,
+    }
+
+def endpoints(users):
+    """(label, role, path) for every benchmarked page."""
+    return [
+        ('student.dashboard', 'student', '/student/dashboard'),
+        ('student.following_feed', 'student', '/student/following'),
+        ('student.club_detail', 'student', f"/student/club/{users['club_slug']}"),
+        ('club.dashboard', 'club', '/club/dashboard'),
+        ('admin.dashboard', 'admin', '/admin/dashboard'),
+    ]
+
+def percentile(sorted_values, p):
+    """Nearest-rank percentile of an already sorted list."""
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+def run_benchmark(app, requests=50, warmup=5, cold=False):
+    """Times every endpoint. Returns {label: {'p50': ms, ..., 'max': ms, 'queries': n, 'status': code}}.
+
+    With cold=True the cache is cleared before every request, so the numbers
+    show the cost of rebuilding each page from the database.
+    """
+    with app.app_context():
+        users = benchmark_users()
+        engine = db.engine
+
+    queries = [0]
+    def count_query(*args):
+        queries[0] += 1
+
+    results = {}
+    request_log = logging.getLogger('bobcat.requests')
+    request_log.disabled = True  # one log line per timed request would drown the report
+    event.listen(engine, 'before_cursor_execute', count_query)
+    try:
+        for label, role, path in endpoints(users):
+            if users[role] is None or path.endswith('/None'):
+                results[label] = {'skipped': f'no {role} user in the database'}
+                continue
+            client = app.test_client()
+            with client.session_transaction() as session:
+                session['_user_id'] = str(users[role])
+                session['_fresh'] = True
+
+            timings, query_counts, status = [], [], None
+            for i in range(warmup + requests):
+                if cold:
+                    with app.app_context():
+                        cache.clear()
+                queries[0] = 0
+                started = time.perf_counter()
+                # A fresh context, so each request gets its own app context (and
+                # g, session and login state) even inside the CLI's app context
+                response = contextvars.Context().run(client.get, path)
+                elapsed = (time.perf_counter() - started) * 1000
+                status = response.status_code
+                if i >= warmup:
+                    timings.append(elapsed)
+                    query_counts.append(queries[0])
+
+            timings.sort()
+            result = {f'p{p}': round(percentile(timings, p), 2) for p in PERCENTILES}
+            result['max'] = round(timings[-1], 2)
+            result['queries'] = round(sum(query_counts) / len(query_counts), 1)
+            result['status'] = status
+            results[label] = result
+    finally:
+        event.remove(engine, 'before_cursor_execute', count_query)
+        request_log.disabled = False
+    return results
+
+def regressions(results, baseline):
+    """Lines describing every endpoint that got slower or chattier than the baseline."""
+    found = []
+    for label, result in results.items():
+        before = baseline.get(label)
+        if 'skipped' in result or not before or 'skipped' in before:
+            continue
+        if result['p90'] > before['p90'] * (1 + LATENCY_TOLERANCE):
+            found.append(f"{label}: p90 {before['p90']}ms -> {result['p90']}ms")
+        if result['queries'] > before['queries']:
+            found.append(f"{label}: queries {before['queries']} -> {result['queries']}")
+    return found
+
+def format_results(results):
+    lines = [f"{'endpoint':<26}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}{'queries':>9}{'status':>8}"]
+    for label, result in results.items():
+        if 'skipped' in result:
+            lines.append(f"{label:<26}  skipped: {result['skipped']}")
+            continue
+        lines.append(f"{label:<26}{result['p50']:>9.1f}{result['p90']:>9.1f}{result['p99']:>9.1f}"
+                     f"{result['max']:>9.1f}{result['queries']:>9}{result['status']:>8}")
+    return '\n'.join(lines)
+
+def save(results, path):
+    with open(path, 'w') as f:
+        json.dump(results, f, indent=2)
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
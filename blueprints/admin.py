@@ -2,6 +2,7 @@ from flask import Blueprint, render_template, redirect, url_for, flash, request
 from flask_login import login_required, current_user
 from models import Club, User, Post  # Added Post
 from extensions import db
+from caching import invalidate, CLUBS_TAG, FEED_TAG, post_tag, club_tag, user_tag
 
 admin_bp = Blueprint('admin', __name__)
 
@@ -41,6 +42,7 @@ def verify_club(club_id):
     club.verified = True
     club.officer_verified = True
     db.session.commit()
+    invalidate(CLUBS_TAG)
     flash(f'{club.name} and its officer have been verified!', 'success')
     return redirect(url_for('admin.dashboard'))
 
@@ -66,6 +68,7 @@ def edit_user_role(user_id):
     if new_role in ['student', 'club', 'admin']:
         user.role = new_role
         db.session.commit()
+        invalidate(user_tag(user_id))  # the role is part of the cached user context
         flash(f'Role for {user.email} updated to {new_role}.', 'success')
     else:
         flash('Invalid role selected.', 'danger')
@@ -87,6 +90,7 @@ def delete_user(user_id):
         
     db.session.delete(user)
     db.session.commit()
+    invalidate(user_tag(user_id))
     flash('User account deleted.', 'success')
     return redirect(url_for('admin.manage_users'))
 
@@ -114,6 +118,7 @@ def reject_club(club_id):
         flash(f'Claim by {user_email} for "{club.name}" was rejected.', 'info')
 
     db.session.commit()
+    invalidate(CLUBS_TAG)
     return redirect(url_for('admin.dashboard'))
 
 # --- NEW: Feed Management Route ---
@@ -125,8 +130,10 @@ def delete_post(post_id):
     if not check_admin_role(): return redirect(url_for('index'))
     
     post = Post.query.get_or_404(post_id)
+    club_id = post.club_id
     db.session.delete(post)
     db.session.commit()
+    invalidate(FEED_TAG, post_tag(post_id), club_tag(club_id))
     flash('Post removed successfully.', 'info')
     
     # Redirect back to where they came from (likely the feed)
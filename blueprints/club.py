@@ -1,9 +1,12 @@
-import os
-import secrets
 from flask import Blueprint, render_template, redirect, url_for, flash, request, current_app
 from flask_login import login_required, current_user
 from models import Club, Post, ClubFollower
 from extensions import db
+import counters
+from images import check_upload, store_upload, InvalidImage
+from jobs import enqueue
+from categories import normalize_categories
+from caching import invalidate, CLUBS_TAG, FEED_TAG, post_tag, club_tag, user_tag
 from datetime import datetime
 
 club_bp = Blueprint('club', __name__)
@@ -14,13 +17,16 @@ def check_club_role():
         return False
     return True
 
-def save_picture(form_picture):
-    random_hex = secrets.token_hex(8)
-    _, f_ext = os.path.splitext(form_picture.filename)
-    picture_fn = random_hex + f_ext
-    picture_path = os.path.join(current_app.root_path, 'static/posts', picture_fn)
-    form_picture.save(picture_path)
-    return picture_fn
+def read_picture(form_picture):
+    """Reads an upload and checks it is an image we accept; raises InvalidImage for bad files."""
+    data = form_picture.read()
+    check_upload(data)
+    return data
+
+def queue_picture(row, data):
+    """Queues an upload for the image pipeline; the row keeps its current picture until the job runs."""
+    upload = store_upload(data, current_app.instance_path)
+    enqueue('process_upload', model=type(row).__name__, row_id=row.id, upload=upload)
 
 @club_bp.route('/dashboard')
 @login_required
@@ -29,8 +35,7 @@ def dashboard():
     if not current_user.club: return redirect(url_for('club.onboarding'))
     
     my_club = current_user.club
-    real_follower_count = ClubFollower.query.filter_by(club_id=my_club.id).count()
-    return render_template('club/dashboard.html', club=my_club, real_follower_count=real_follower_count)
+    return render_template('club/dashboard.html', club=my_club, real_follower_count=my_club.follower_count)
 
 @club_bp.route('/settings', methods=['GET', 'POST'])
 @login_required
@@ -45,8 +50,12 @@ def settings():
         if 'image' in request.files:
             file = request.files['image']
             if file and file.filename != '':
-                club.image_file = save_picture(file)
+                try: queue_picture(club, read_picture(file))
+                except InvalidImage as e:
+                    flash(str(e), 'danger')
+                    return redirect(url_for('club.settings'))
         db.session.commit()
+        invalidate(CLUBS_TAG)
         flash('Profile updated!', 'success')
         return redirect(url_for('club.dashboard'))
     return render_template('club/settings.html', club=club)
@@ -72,12 +81,14 @@ def onboarding():
                 existing.officer_verified = False
                 existing.description = desc
                 db.session.commit()
+                invalidate(CLUBS_TAG)
                 flash(f'Claimed {club_name}. Wait for verification.', 'warning')
                 return redirect(url_for('club.dashboard'))
         else:
-            new_club = Club(name=club_name, category=category, description=desc, owner_id=current_user.id, verified=False, officer_verified=False, member_count=1)
+            new_club = Club(name=club_name, category=normalize_categories(category), description=desc, owner_id=current_user.id, verified=False, officer_verified=False, member_count=1)
             db.session.add(new_club)
             db.session.commit()
+            invalidate(CLUBS_TAG)
             flash('Club created. Wait for verification.', 'success')
             return redirect(url_for('club.dashboard'))
     return render_template('club/onboarding.html')
@@ -93,12 +104,16 @@ def create_event():
     if request.method == 'POST':
         caption = request.form.get('caption')
         is_event = 'is_event' in request.form
-        image_file = 'default.jpg'
+        picture = None
         if 'image' in request.files:
             file = request.files['image']
-            if file and file.filename != '': image_file = save_picture(file)
+            if file and file.filename != '':
+                try: picture = read_picture(file)
+                except InvalidImage as e:
+                    flash(str(e), 'danger')
+                    return redirect(url_for('club.create_event'))
 
-        new_post = Post(club_id=current_user.club.id, caption=caption, image_file=image_file, is_event=is_event)
+        new_post = Post(club_id=current_user.club.id, caption=caption, image_file='default.jpg', is_event=is_event)
         
         if is_event:
             new_post.event_title = request.form.get('event_title')
@@ -109,7 +124,11 @@ def create_event():
                 except: new_post.event_date = datetime.now()
 
         db.session.add(new_post)
+        if picture:
+            db.session.flush()  # the job needs the post id
+            queue_picture(new_post, picture)
         db.session.commit()
+        invalidate(FEED_TAG, club_tag(new_post.club_id))
         flash('Posted!', 'success')
         return redirect(url_for('club.dashboard'))
     return render_template('club/create_event.html')
@@ -125,7 +144,11 @@ def edit_post(post_id):
         post.caption = request.form.get('caption')
         if 'image' in request.files:
             file = request.files['image']
-            if file and file.filename != '': post.image_file = save_picture(file)
+            if file and file.filename != '':
+                try: queue_picture(post, read_picture(file))
+                except InvalidImage as e:
+                    flash(str(e), 'danger')
+                    return redirect(url_for('club.edit_post', post_id=post.id))
         post.is_event = 'is_event' in request.form
         if post.is_event:
             post.event_title = request.form.get('event_title')
@@ -135,6 +158,7 @@ def edit_post(post_id):
                 try: post.event_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
                 except: pass 
         db.session.commit()
+        invalidate(post_tag(post.id), club_tag(post.club_id))
         flash('Updated!', 'success')
         return redirect(url_for('club.dashboard'))
     return render_template('club/edit_post.html', post=post)
@@ -152,7 +176,9 @@ def remove_follower(user_id):
     if not check_club_role() or not current_user.club: return redirect(url_for('index'))
     follow = ClubFollower.query.filter_by(club_id=current_user.club.id, user_id=user_id).first_or_404()
     db.session.delete(follow)
+    counters.adjust(Club.follower_count, follow.club_id, -1)
     db.session.commit()
+    invalidate(club_tag(follow.club_id), user_tag(user_id))
     flash('Removed follower.', 'info')
     return redirect(url_for('club.manage_followers'))
 
@@ -1,7 +1,19 @@
-from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, redirect, url_for, flash, request, jsonify, abort, Response, stream_with_context
 from flask_login import login_required, current_user
 from extensions import db, cache
 from models import Club, Post, RSVP, ClubFollower, PostLike
+from feed import feed_query, paginate, post_card
+from caching import get_or_build, invalidate, tag_versions, CLUBS_TAG, FEED_TAG, post_tag, club_tag, user_tag
+from search import search_post_ids
+from timeline import following_page
+import counters
+from interactions import InvalidIntent, apply_intents, parse_intents
+from ical import calendar_token, ics_lines, reset_calendar_secret, token_user_id
+from conditional import not_modified
+from user_context import user_context
+from directory import directory_page, facet_counts
+from slugs import redirect_target
+from sqlalchemy import func, select
 from datetime import datetime, timezone
 
 student = Blueprint('student', __name__)
@@ -20,6 +32,46 @@ def make_cache_key(*args, **kwargs):
     uid = current_user.id if current_user.is_authenticated else 'guest'
     return f"{path}_{uid}"
 
+def global_feed_query():
+    """Verified posts for the global feed."""
+    return feed_query().filter(Club.verified == True)
+
+def search_feed(search_query):
+    """Verified posts matching a search, ranked by the full-text index."""
+    post_ids = search_post_ids(search_query, verified_only=True)
+    rank = {post_id: position for position, post_id in enumerate(post_ids)}
+    posts = global_feed_query().filter(Post.id.in_(post_ids)).all()
+    return sorted(posts, key=lambda post: rank[post.id])
+
+def global_feed_page(cursor):
+    """One page of the global feed as post cards; the first page is cached and shared by every user."""
+    def build():
+        posts, next_cursor = paginate(global_feed_query(), cursor)
+        return ([post_card(post) for post in posts], next_cursor), [post_tag(post.id) for post in posts]
+
+    if cursor:
+        # Cursors come from the client, so a key per cursor would let anyone fill
+        # the cache; later pages are one indexed range scan each (see feed.py)
+        return build()[0]
+    return get_or_build('feed:global:', [CLUBS_TAG, FEED_TAG], build)
+
+def user_feed_metadata():
+    """RSVP, follow and like sets used to render the buttons on each feed card."""
+    context = user_context(current_user.id)
+    return {
+        'user_rsvps': context['rsvps'],
+        'followed_club_ids': context['follows'],
+        'user_likes': context['likes'],
+    }
+
+def save_intents(intents):
+    """Applies like/RSVP intents for the current user, commits and expires the affected pages."""
+    states, changed = apply_intents(current_user.id, intents)
+    db.session.commit()
+    if changed:
+        invalidate(user_tag(current_user.id), *map(post_tag, changed))
+    return states
+
 # --- Dashboard & Feeds ---
 # blueprints/student.py
 
@@ -29,34 +81,20 @@ def dashboard():
     if not check_student_role():
         return redirect(url_for('index'))
     
-    # Start the query
-    query = Post.query.join(Club).filter(Club.verified == True)
-    
-    # --- NEW: SEARCH LOGIC ---
     search_query = request.args.get('q')
     if search_query:
-        query = query.filter(
-            (Post.event_title.ilike(f'%{search_query}%')) | 
-            (Post.caption.ilike(f'%{search_query}%')) |
-            (Club.name.ilike(f'%{search_query}%'))
-        )
-    # -------------------------
-
-    # Execute query with sort
-    posts = query.order_by(Post.created_at.desc()).all()
-    
-    # Metadata
-    user_rsvps = {rsvp.post_id for rsvp in current_user.rsvps}
-    followed_club_ids = {follow.club_id for follow in current_user.followed_clubs}
-    user_likes = {like.post_id for like in PostLike.query.filter_by(user_id=current_user.id).all()}
+        # Search results are ranked by relevance and capped, so they are not paged
+        posts, next_cursor = search_feed(search_query), None
+    else:
+        # Only the first page is rendered; the rest is loaded by feed_page as the user scrolls
+        posts, next_cursor = global_feed_page(request.args.get('cursor'))
     
     return render_template('student/dashboard.html', 
                          events=posts, 
-                         user_rsvps=user_rsvps,
-                         followed_club_ids=followed_club_ids,
-                         user_likes=user_likes,
+                         next_cursor=next_cursor,
                          feed_type='global',
-                         search_query=search_query) # Pass query back to template
+                         search_query=search_query, # Pass query back to template
+                         **user_feed_metadata())
 
 @student.route('/following')
 @login_required
@@ -65,23 +103,31 @@ def following_feed():
     if not check_student_role():
         return redirect(url_for('index'))
 
-    # 1. Get IDs of clubs the user follows
-    followed_club_ids = [f.club_id for f in current_user.followed_clubs]
-
-    # 2. Query posts from those clubs only
-    posts = Post.query.filter(
-        Post.club_id.in_(followed_club_ids)
-    ).order_by(Post.created_at.desc()).all()
-
-    user_rsvps = {rsvp.post_id for rsvp in current_user.rsvps}
-    user_likes = {like.post_id for like in PostLike.query.filter_by(user_id=current_user.id).all()}
+    metadata = user_feed_metadata()
+    posts, next_cursor = following_page(current_user.id, metadata['followed_club_ids'],
+                                        request.args.get('cursor'))
     
     return render_template('student/dashboard.html', 
                          events=posts, 
-                         user_rsvps=user_rsvps,
-                         followed_club_ids=set(followed_club_ids),
-                         user_likes=user_likes,
-                         feed_type='following')
+                         next_cursor=next_cursor,
+                         feed_type='following',
+                         **metadata)
+
+@student.route('/feed/page')
+@login_required
+def feed_page():
+    """Infinite scroll: returns the next page of feed cards as an HTML fragment."""
+    if current_user.role not in ['student', 'club', 'admin']:
+        return jsonify({'error': 'Access denied.'}), 403
+
+    metadata = user_feed_metadata()
+    if request.args.get('feed') == 'following':
+        posts, next_cursor = following_page(current_user.id, metadata['followed_club_ids'],
+                                            request.args.get('cursor'))
+    else:
+        posts, next_cursor = global_feed_page(request.args.get('cursor'))
+    html = render_template('student/_feed_cards.html', events=posts, **metadata)
+    return jsonify({'html': html, 'next_cursor': next_cursor})
 
 @student.route('/my-rsvps')
 @login_required
@@ -95,30 +141,85 @@ def my_rsvps():
         RSVP.user_id == current_user.id
     ).order_by(Post.event_date).all()
     
-    return render_template('student/my_rsvps.html', events=rsvp_posts)
+    calendar_url = url_for('student.calendar_ics', token=calendar_token(current_user.id), _external=True)
+    db.session.commit()  # the first visit creates the user's calendar secret
+    return render_template('student/my_rsvps.html', events=rsvp_posts, calendar_url=calendar_url)
+
+# --- Calendar ---
+
+def parse_calendar_bound(value):
+    """FullCalendar's ?start= / ?end= (ISO 8601, maybe with an offset) as a naive UTC datetime, like the stored dates."""
+    if not value:
+        return None
+    bound = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if bound.tzinfo is not None:
+        bound = bound.astimezone(timezone.utc).replace(tzinfo=None)
+    return bound
+
+def rsvp_events_query(user_id):
+    """The user's RSVP'd events that have a date, soonest first."""
+    return db.session.query(Post.id, Post.event_title, Post.event_date, Post.event_location, Post.caption) \
+        .join(RSVP, RSVP.post_id == Post.id) \
+        .filter(RSVP.user_id == user_id, Post.is_event == True, Post.event_date != None) \
+        .order_by(Post.event_date)
+
+def rsvp_calendar(user_id, start, end):
+    """FullCalendar event dicts between start and end, cached until an RSVP or one of the events changes."""
+    def build():
+        query = rsvp_events_query(user_id)
+        if start:
+            query = query.filter(Post.event_date >= start)
+        if end:
+            query = query.filter(Post.event_date < end)
+        rows = query.all()
+        event_url = url_for('student.event_detail', post_id=0)[:-1]  # one url_for for the whole list
+        events = [{
+            'title': row.event_title,
+            'start': row.event_date.isoformat(),
+            'url': f'{event_url}{row.id}',
+            'color': '#0d6efd'  # Bootstrap Primary Blue
+        } for row in rows]
+        return events, [post_tag(row.id) for row in rows]
+
+    key = f'calendar:{user_id}:{start.isoformat() if start else ""}:{end.isoformat() if end else ""}'
+    return get_or_build(key, [user_tag(user_id)], build)
 
-# --- NEW: API Route for Calendar (FIXES YOUR ISSUE) ---
 @student.route('/api/my-rsvps')
 @login_required
 def get_rsvp_events_json():
-    """API endpoint for FullCalendar"""
-    # Get user's RSVPs
-    rsvp_posts = Post.query.join(RSVP).filter(
-        RSVP.user_id == current_user.id
-    ).all()
-    
-    events_data = []
-    for post in rsvp_posts:
-        # Only add to calendar if it's an event with a valid date
-        if post.is_event and post.event_date:
-            events_data.append({
-                'title': post.event_title,
-                'start': post.event_date.isoformat(), # Formats date for JS
-                'url': url_for('student.event_detail', post_id=post.id),
-                'color': '#0d6efd' # Bootstrap Primary Blue
-            })
-            
-    return jsonify(events_data)
+    """API endpoint for FullCalendar; answers 304 while the events in the range are unchanged."""
+    try:
+        start = parse_calendar_bound(request.args.get('start'))
+        end = parse_calendar_bound(request.args.get('end'))
+    except ValueError:
+        return jsonify({'error': 'start and end must be ISO 8601 dates.'}), 400
+
+    response = jsonify(rsvp_calendar(current_user.id, start, end))
+    response.add_etag()
+    response.headers['Cache-Control'] = 'private, no-cache'  # revalidate every time, cheaply
+    return response.make_conditional(request)
+
+@student.route('/calendar/<token>.ics')
+def calendar_ics(token):
+    """iCal subscription of a user's RSVP'd events, streamed row by row."""
+    user_id = token_user_id(token)
+    if user_id is None:
+        abort(404)
+
+    rows = rsvp_events_query(user_id).yield_per(500)
+    event_url = url_for('student.event_detail', post_id=0, _external=True)[:-1]
+    lines = ics_lines(rows, 'Bobcat Connect RSVPs', request.host, lambda post_id: f'{event_url}{post_id}')
+    return Response(stream_with_context(lines), mimetype='text/calendar',
+                    headers={'Content-Disposition': 'inline; filename="rsvps.ics"'})
+
+@student.route('/calendar/reset', methods=['POST'])
+@login_required
+def reset_calendar_link():
+    """Revokes the user's iCal subscription link and issues a new one."""
+    reset_calendar_secret(current_user.id)
+    db.session.commit()
+    flash('Your calendar link was reset. Subscribe again with the new link.', 'info')
+    return redirect(url_for('student.my_rsvps'))
 
 # --- Interactions ---
 
@@ -128,17 +229,22 @@ def event_detail(post_id):
     if not check_student_role():
         return redirect(url_for('index'))
     
+    stamps = db.session.query(Post.updated_at, Club.updated_at) \
+        .join(Club, Club.id == Post.club_id).filter(Post.id == post_id).first()
+    if stamps and (response := not_modified(post_id, *stamps)):
+        return response
+
     post = Post.query.get_or_404(post_id)
     
-    has_rsvp = RSVP.query.filter_by(user_id=current_user.id, post_id=post_id).first() is not None
-    is_following = ClubFollower.query.filter_by(user_id=current_user.id, club_id=post.club_id).first() is not None
-    rsvp_count = RSVP.query.filter_by(post_id=post_id).count()
+    metadata = user_feed_metadata()
+    has_rsvp = post_id in metadata['user_rsvps']
+    is_following = post.club_id in metadata['followed_club_ids']
     
     return render_template('student/event_detail.html', 
                          event=post, 
                          has_rsvp=has_rsvp,
                          is_following=is_following,
-                         rsvp_count=rsvp_count)
+                         rsvp_count=post.rsvp_count)
 
 @student.route('/rsvp/<int:post_id>', methods=['POST'])
 @login_required
@@ -156,13 +262,16 @@ def toggle_rsvp(post_id):
     
     if existing_rsvp:
         db.session.delete(existing_rsvp)
+        counters.adjust(Post.rsvp_count, post_id, -1)
         flash('RSVP removed', 'info')
     else:
         rsvp = RSVP(user_id=current_user.id, post_id=post_id)
         db.session.add(rsvp)
+        counters.adjust(Post.rsvp_count, post_id, 1)
         flash('RSVP confirmed!', 'success')
     
     db.session.commit()
+    invalidate(user_tag(current_user.id), post_tag(post_id))
     return redirect(request.referrer or url_for('student.dashboard'))
 
 @student.route('/follow/<int:club_id>', methods=['POST'])
@@ -176,70 +285,126 @@ def toggle_follow(club_id):
     
     if existing_follow:
         db.session.delete(existing_follow)
+        counters.adjust(Club.follower_count, club_id, -1)
         flash(f'Unfollowed {club.name}', 'info')
     else:
         follow = ClubFollower(user_id=current_user.id, club_id=club_id)
         db.session.add(follow)
+        counters.adjust(Club.follower_count, club_id, 1)
         flash(f'Now following {club.name}!', 'success')
     
     db.session.commit()
+    invalidate(user_tag(current_user.id), club_tag(club_id))
     return redirect(request.referrer or url_for('student.dashboard'))
 
 # --- NEW: Like Feature API ---
 @student.route('/like/<int:post_id>', methods=['POST'])
 @login_required
 def toggle_like(post_id):
-    post = Post.query.get_or_404(post_id)
-    like = PostLike.query.filter_by(user_id=current_user.id, post_id=post.id).first()
-    
-    liked = False
-    if like:
-        db.session.delete(like)
-        liked = False
-    else:
-        new_like = PostLike(user_id=current_user.id, post_id=post.id)
-        db.session.add(new_like)
-        liked = True
-        
-    db.session.commit()
-    
+    Post.query.get_or_404(post_id)
+    liked = PostLike.query.filter_by(user_id=current_user.id, post_id=post_id).first() is None
+    states = save_intents([('like', post_id, liked)])
+
     return jsonify({
-        'likes_count': len(post.likes),
+        'likes_count': states[post_id]['likes_count'],
         'liked': liked
     })
 
+@student.route('/interactions', methods=['POST'])
+@login_required
+def batch_interactions():
+    """Applies a batch of like/RSVP intents (see interactions.py) and returns each post's final state."""
+    try:
+        intents = parse_intents(request.get_json(silent=True))
+    except InvalidIntent as e:
+        return jsonify({'error': str(e)}), 400
+    states = save_intents(intents)
+    return jsonify({'posts': {str(post_id): state for post_id, state in states.items()}})
+
 # --- Club Pages ---
 
 @student.route('/clubs')
 @login_required
 def browse_clubs():
-    all_clubs = Club.query.all()
-    return render_template('student/browse_clubs.html', clubs=all_clubs)
+    # Every part of the page is cached under CLUBS_TAG, so its version is the validator;
+    # answering a revalidation costs a cache read, not a query
+    if response := not_modified(tag_versions([CLUBS_TAG])[CLUBS_TAG]):
+        return response
+
+    category = request.args.get('category') or None
+    search_prefix = request.args.get('q', '')
+    clubs, next_cursor = directory_page(category, search_prefix, request.args.get('cursor'))
+    return render_template('student/browse_clubs.html', clubs=clubs, next_cursor=next_cursor,
+                           facets=facet_counts(), category=category, search_prefix=search_prefix)
 
-@student.route('/club/<string:club_name_slug>')
+@student.route('/api/clubs')
 @login_required
-def club_detail(club_name_slug):
+def club_directory_json():
+    """Club directory API: ?category= facet, ?q= name prefix, ?cursor= next page."""
+    clubs, next_cursor = directory_page(request.args.get('category') or None, request.args.get('q'),
+                                        request.args.get('cursor'))
+    return jsonify({'clubs': clubs, 'next_cursor': next_cursor, 'facets': facet_counts()})
+
+@student.route('/club/<string:slug>')
+@login_required
+def club_detail(slug):
     if not check_student_role():
         return redirect(url_for('index'))
-    
-    club_name = club_name_slug.replace('_', ' ')
-    club = Club.query.filter_by(name=club_name).first_or_404()
-    
-    is_following = ClubFollower.query.filter_by(user_id=current_user.id, club_id=club.id).first() is not None
-    
-    upcoming_events = Post.query.filter(
-        Post.club_id == club.id,
-        Post.is_event == True,
-        Post.event_date >= datetime.now(timezone.utc)
-    ).order_by(Post.event_date).all()
-    
-    follower_count = ClubFollower.query.filter_by(club_id=club.id).count()
+
+    # Upcoming events drop off as they start, so the page also changes every hour
+    latest_post = select(func.max(Post.updated_at)).where(Post.club_id == Club.id).correlate(Club).scalar_subquery()
+    stamps = db.session.query(Club.id, Club.updated_at, latest_post).filter(Club.slug == slug).first()
+    if stamps is None:
+        # A renamed club, or a link from before slugs: send it to the current page
+        target = redirect_target(slug)
+        if target is None:
+            abort(404)
+        return redirect(url_for('student.club_detail', slug=target), 301)
+    club_id = stamps[0]
+    hour = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H')
+    if response := not_modified(*stamps, hour):
+        return response
+
+    def build():
+        club = db.session.get(Club, club_id)
+
+        upcoming_events = Post.query.filter(
+            Post.club_id == club.id,
+            Post.is_event == True,
+            Post.event_date >= datetime.now(timezone.utc)
+        ).order_by(Post.event_date).all()
+
+        page = {
+            'club': {
+                'id': club.id,
+                'name': club.name,
+                'slug': club.slug,
+                'image_file': club.image_file,
+                'category': club.category,
+                'description': club.description,
+                'location': club.location,
+                'meeting_time': club.meeting_time,
+                'member_count': club.member_count,
+                'follower_count': club.follower_count,
+                'posts': [post_card(post) for post in club.posts],
+            },
+            'upcoming_events': [post_card(event) for event in upcoming_events],
+        }
+        return page, [club_tag(club.id)]
+
+    page = get_or_build(f'club_detail:{club_id}', [CLUBS_TAG], build)
+    club = page['club']
+
+    # The cached list may hold events that have started since it was built
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    upcoming_events = [event for event in page['upcoming_events'] if event['event_date'] >= now]
+    is_following = club['id'] in user_feed_metadata()['followed_club_ids']
     
     return render_template('student/club_detail.html',
                            club=club,
                            is_following=is_following,
                            upcoming_events=upcoming_events,
-                           follower_count=follower_count)
+                           follower_count=club['follower_count'])
 
 @student.route('/my-clubs')
 @login_required
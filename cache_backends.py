@@ -0,0 +1,66 @@
+# cache_backends.py
+# Picks the Flask-Caching backend from a CACHE_URL, the same way DATABASE_URL
+# picks the database:
+#
+#   simple://                  in-process memory (default; one cache per worker)
+#   file:///var/cache/bobcat   files on disk, shared by every worker on the host
+#   shm://                     files on tmpfs (/dev/shm), shared memory for workers on one host
+#   redis://host:6379/0        any Redis-protocol server, shared across hosts
+#   null://                    caching disabled
+import os
+from urllib.parse import urlparse
+
+SHM_CACHE_DIR = '/dev/shm/bobcat-cache'
+
+def cache_config(url):
+    """Returns the Flask-Caching settings for a CACHE_URL."""
+    parsed = urlparse(url or 'simple://')
+    scheme = parsed.scheme
+
+    if scheme in ('', 'simple'):
+        return {'CACHE_TYPE': 'SimpleCache'}
+    if scheme == 'null':
+        return {'CACHE_TYPE': 'NullCache'}
+    if scheme in ('file', 'shm'):
+        directory = parsed.path or (SHM_CACHE_DIR if scheme == 'shm' else None)
+        if not directory:
+            raise ValueError(f'CACHE_URL {url!r} needs a directory, e.g. file:///var/cache/bobcat')
+        return {
+            'CACHE_TYPE': 'FileSystemCache',
+            'CACHE_DIR': directory,
+            'CACHE_THRESHOLD': int(os.getenv('CACHE_THRESHOLD', 10000)),
+        }
+    if scheme in ('redis', 'rediss', 'unix'):
+        return {
+            'CACHE_TYPE': 'RedisCache',
+            'CACHE_REDIS_URL': url,
+            'CACHE_KEY_PREFIX': os.getenv('CACHE_KEY_PREFIX', 'bobcat:'),
+        }
+    raise ValueError(f'Unsupported CACHE_URL scheme: {scheme!r}')
+
+def check_backend(cache):
+    """Runs the operations caching.py relies on against `cache`. Returns a list of failures."""
+    failures = []
+
+    def expect(label, actual, expected):
+        if actual != expected:
+            failures.append(f'{label}: expected {expected!r}, got {actual!r}')
+
+    cache.delete_many('check:a', 'check:b', 'check:c')
+    cache.set('check:a', {'tags': {'t': 'v1'}, 'value': [1, 2, 3]})
+    expect('get', cache.get('check:a'), {'tags': {'t': 'v1'}, 'value': [1, 2, 3]})
+    expect('get missing', cache.get('check:missing'), None)
+
+    cache.set_many({'check:b': 'v2', 'check:c': {4, 5}}, timeout=0)
+    expect('get_many', cache.get_many('check:a', 'check:b', 'check:c', 'check:missing'),
+           [{'tags': {'t': 'v1'}, 'value': [1, 2, 3]}, 'v2', {4, 5}, None])
+
+    expect('add existing', bool(cache.add('check:b', 'other')), False)
+    expect('add kept value', cache.get('check:b'), 'v2')
+    cache.delete('check:b')
+    expect('add new', bool(cache.add('check:b', 'v3')), True)
+    expect('add stored value', cache.get('check:b'), 'v3')
+
+    cache.delete_many('check:a', 'check:b', 'check:c')
+    expect('delete', cache.get_many('check:a', 'check:b', 'check:c'), [None, None, None])
+    return failures
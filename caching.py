@@ -0,0 +1,55 @@
+# caching.py
+# Tag-based caching on top of extensions.cache.
+# Every entry remembers the version of each tag it was built from; invalidating
+# a tag gives it a new version, so all entries built under the old one miss on
+# their next read. Values must be plain data (dicts, lists, sets) - never ORM
+# objects, which would be detached from the session that loaded them.
+import secrets
+from extensions import cache
+from routing import primary
+
+# Shared tags
+CLUBS_TAG = 'clubs'   # any club created, edited, verified or removed
+FEED_TAG = 'feed'     # a post was added to (or removed from) the top of the feed
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+def club_tag(club_id):
+    return f'club:{club_id}'
+
+def user_tag(user_id):
+    return f'user:{user_id}'
+
+def tag_versions(tags):
+    """Returns the current version of each tag, creating versions for new tags."""
+    keys = [f'tag:{tag}' for tag in tags]
+    versions = dict(zip(tags, cache.get_many(*keys))) if keys else {}
+    for tag, version in versions.items():
+        if version is None:
+            # add() keeps whichever version another worker may have just created
+            cache.add(f'tag:{tag}', secrets.token_hex(4), timeout=0)
+            versions[tag] = cache.get(f'tag:{tag}')
+    return versions
+
+def invalidate(*tags):
+    """Expires every cached entry built under any of `tags`."""
+    cache.set_many({f'tag:{tag}': secrets.token_hex(4) for tag in tags}, timeout=0)
+
+def get_or_build(key, tags, build, timeout=None):
+    """Returns the cached value for `key`, or calls build() and caches what it returns.
+
+    `tags` are known up front; build() returns (value, extra_tags) for tags that
+    depend on the result, such as the posts that ended up on a feed page.
+    """
+    entry = cache.get(key)
+    if entry is not None and tag_versions(list(entry['tags'])) == entry['tags']:
+        return entry['value']
+
+    # Read versions before building so an invalidation during the build is not lost
+    versions = tag_versions(list(tags))
+    with primary():  # a value built from a lagging replica would stay stale until the next invalidation
+        value, extra_tags = build()
+    versions.update(tag_versions(list(extra_tags)))
+    cache.set(key, {'tags': versions, 'value': value}, timeout=timeout)
+    return value
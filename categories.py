@@ -0,0 +1,90 @@
+# categories.py
+# Normalized club categories. Club.category keeps the display string
+# ("Community Service, Faith Based, Social"); the category and club_category
+# tables hold the same list as rows, so "clubs in Cultural" and the facet
+# counts are indexed joins instead of a LIKE over every club.
+#
+# Both are derived from one parser, parse_categories(), so they never
+# disagree. ORM writes are kept in step by the mapper events below; Core
+# writes (bulk_import, migrations) call sync_club_categories() themselves.
+# Forms normalize their input with the same parser:
+#
+#   club = Club(name=name, category=normalize_categories(request.form.get('category')))
+#
+# Names are matched case-insensitively; a category keeps the spelling it was
+# first created with.
+import re
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models import Category, Club, club_category
+
+MAX_NAME = 100
+
+def parse_categories(value):
+    """'Cultural,  social, Cultural' -> ['Cultural', 'social']: split on commas, trimmed, de-duplicated."""
+    names, seen = [], set()
+    for part in (value or '').split(','):
+        name = re.sub(r'\s+', ' ', part).strip()[:MAX_NAME]
+        if name and name.lower() not in seen:
+            seen.add(name.lower())
+            names.append(name)
+    return names
+
+def normalize_categories(value):
+    """The Club.category display string for raw input: 'Cultural ,social,' -> 'Cultural, social'."""
+    return ', '.join(parse_categories(value)) or None
+
+# --- Syncing ---
+
+def _insert(connection, table):
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table)
+
+def _category_ids(connection, names):
+    """{lower name: category id} for `names`, creating the categories that do not exist yet."""
+    wanted = {name.lower(): name for name in names}
+    lookup = select(func.lower(Category.name), Category.id).where(func.lower(Category.name).in_(list(wanted)))
+    ids = dict(connection.execute(lookup).all()) if wanted else {}
+    missing = [{'name': name} for lower, name in wanted.items() if lower not in ids]
+    if missing:
+        statement = _insert(connection, Category.__table__).on_conflict_do_nothing(index_elements=['name'])
+        connection.execute(statement, missing)
+        ids = dict(connection.execute(lookup).all())
+    return ids
+
+def sync_club_categories(connection, club_ids):
+    """Rewrites the club_category rows of `club_ids` from their Club.category strings."""
+    club_ids = list(club_ids)
+    if not club_ids:
+        return
+    parsed = {row.id: parse_categories(row.category) for row in
+              connection.execute(select(Club.id, Club.category).where(Club.id.in_(club_ids)))}
+    ids = _category_ids(connection, {name for names in parsed.values() for name in names})
+    connection.execute(delete(club_category).where(club_category.c.club_id.in_(club_ids)))
+    rows = [{'club_id': club_id, 'category_id': ids[name.lower()]}
+            for club_id, names in parsed.items() for name in names]
+    if rows:
+        connection.execute(club_category.insert(), rows)
+
+def rebuild_club_categories(engine, batch_size=1000):
+    """Re-derives club_category for every club, one batch of clubs per transaction."""
+    with engine.connect() as connection:
+        max_id = connection.scalar(select(func.max(Club.id))) or 0
+    for start in range(1, max_id + 1, batch_size):
+        with engine.begin() as connection:
+            sync_club_categories(connection, connection.scalars(
+                select(Club.id).where(Club.id.between(start, start + batch_size - 1))))
+
+# Keep club_category in step with ORM writes, inside the same transaction
+@event.listens_for(Club, 'after_insert')
+def _sync_new_club(mapper, connection, club):
+    sync_club_categories(connection, [club.id])
+
+@event.listens_for(Club, 'after_update')
+def _sync_club(mapper, connection, club):
+    if inspect(club).attrs.category.history.has_changes():
+        sync_club_categories(connection, [club.id])
+
+@event.listens_for(Club, 'before_delete')
+def _remove_club(mapper, connection, club):
+    connection.execute(delete(club_category).where(club_category.c.club_id == club.id))
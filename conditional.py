@@ -0,0 +1,83 @@
+# conditional.py
+# Conditional GET for the student pages.
+# A view first computes its validators from cheap version stamps
+# (Club.updated_at, Post.updated_at, usually one indexed query; or the cache
+# tag version, for pages built only from entries cached under that tag) and
+# calls not_modified(); when the browser's copy is current it gets a 304 before any
+# page data is loaded or any template rendered:
+#
+#   stamps = db.session.query(Post.updated_at, Club.updated_at)...first()
+#   response = not_modified('event', post_id, *stamps)
+#   if response:
+#       return response
+#   ... build and render as usual; ETag and Last-Modified are added after ...
+#
+# The ETag also covers everything per user on the page: the user id, the
+# user's cache tag version (bumped by follows, RSVPs and likes) and the
+# templates deployed. Responses are "private, no-cache" with Vary: Cookie, so
+# shared caches never store them and browsers always revalidate. Requests
+# with flashed messages waiting are always rendered in full.
+import hashlib
+import os
+from datetime import datetime, timezone
+from flask import g, request, session, make_response
+from flask_login import current_user
+from sqlalchemy import event, update
+from models import Club, Post
+from caching import tag_versions, user_tag
+
+def _release():
+    """Fingerprint of the deployed templates, so a deploy changes every ETag."""
+    digest = hashlib.sha1()
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'templates')
+    for directory, _, files in sorted(os.walk(root)):
+        for name in sorted(files):
+            stat = os.stat(os.path.join(directory, name))
+            digest.update(f'{name}:{stat.st_mtime_ns}:{stat.st_size};'.encode())
+    return digest.hexdigest()[:12]
+
+RELEASE = _release()
+
+def not_modified(*stamps):
+    """Returns a 304 response if the client's copy of this page is current, else None.
+
+    `stamps` are the values the page depends on (ids, version datetimes);
+    datetimes among them also give the Last-Modified date.
+    """
+    if session.get('_flashes'):
+        return None  # the flashed message has to be rendered
+
+    user_id = current_user.get_id()
+    user_version = tag_versions([user_tag(user_id)]).get(user_tag(user_id)) if user_id else None
+    key = repr((RELEASE, request.full_path, user_id, user_version) + stamps)
+    etag = hashlib.sha1(key.encode()).hexdigest()
+    dates = [stamp for stamp in stamps if isinstance(stamp, datetime)]
+    g.validators = (etag, max(dates).replace(tzinfo=timezone.utc) if dates else None)
+
+    if request.if_none_match.contains(etag):
+        response = make_response('', 304)
+        return _add_validators(response)
+    return None
+
+def _add_validators(response):
+    validators = g.pop('validators', None)
+    if validators is None or response.status_code not in (200, 304):
+        return response
+    etag, last_modified = validators
+    response.set_etag(etag)
+    if last_modified:
+        response.last_modified = last_modified
+    response.headers['Cache-Control'] = 'private, no-cache'
+    response.vary.add('Cookie')
+    return response
+
+# A post added or removed changes its club's page, so it touches the club
+@event.listens_for(Post, 'after_insert')
+@event.listens_for(Post, 'after_delete')
+def _touch_club(mapper, connection, post):
+    connection.execute(update(Club).where(Club.id == post.club_id)
+                       .values(updated_at=datetime.now(timezone.utc)))
+
+def init_app(app):
+    """Adds ETag, Last-Modified and Vary to responses of views that called not_modified()."""
+    app.after_request(_add_validators)
@@ -0,0 +1,69 @@
+# counters.py
+# Denormalized counters (Post.like_count, Post.rsvp_count, Club.follower_count).
+# Views bump them in the same transaction as the row they add or delete, so
+# reading a count is a column lookup instead of a COUNT(*) over the child table.
+from sqlalchemy import func, select, text
+from extensions import db
+from models import Club, Post, RSVP, ClubFollower, PostLike
+
+# (counter column, child table column that points at the counted row)
+COUNTERS = [
+    (Post.like_count, PostLike.post_id),
+    (Post.rsvp_count, RSVP.post_id),
+    (Club.follower_count, ClubFollower.club_id),
+]
+
+def adjust(column, row_id, delta):
+    """Adds `delta` to a counter column with a single UPDATE; the caller commits."""
+    model = column.class_
+    db.session.query(model).filter(model.id == row_id).update(
+        {column: column + delta}, synchronize_session=False
+    )
+
+def adjust_many(column, row_ids, delta):
+    """adjust() for many rows in one UPDATE ... WHERE id IN (...); the caller commits."""
+    if not row_ids:
+        return
+    model = column.class_
+    db.session.query(model).filter(model.id.in_(list(row_ids))).update(
+        {column: column + delta}, synchronize_session=False
+    )
+
+def reconcile():
+    """Recomputes every counter from the child rows. Returns how many rows were repaired."""
+    repaired = 0
+    for column, foreign_key in COUNTERS:
+        model = column.class_
+        actual = select(func.count()).where(foreign_key == model.id).correlate(model).scalar_subquery()
+        result = db.session.query(model).filter(column != actual).update(
+            {column: actual}, synchronize_session=False
+        )
+        repaired += result
+    db.session.commit()
+    return repaired
+
+# The same counters as plain (table, column, child table, child column) names.
+# Migrations run backfill() before later columns such as updated_at exist, so
+# its UPDATEs are written out by hand and never pick up a model's onupdate.
+BACKFILL_COLUMNS = [
+    ('post', 'like_count', 'post_like', 'post_id'),
+    ('post', 'rsvp_count', 'rsvp', 'post_id'),
+    ('club', 'follower_count', 'club_follower', 'club_id'),
+]
+
+def backfill(engine, batch_size=1000):
+    """Fills every counter from the child rows in short per-batch transactions.
+
+    Used by migrations: unlike reconcile() it never holds locks on a whole table.
+    """
+    for table, column, child, foreign_key in BACKFILL_COLUMNS:
+        update = text(
+            f"UPDATE {table} SET {column} = "
+            f"(SELECT COUNT(*) FROM {child} WHERE {child}.{foreign_key} = {table}.id) "
+            f"WHERE id BETWEEN :start AND :end"
+        )
+        with engine.connect() as connection:
+            max_id = connection.scalar(text(f"SELECT MAX(id) FROM {table}")) or 0
+        for start in range(1, max_id + 1, batch_size):
+            with engine.begin() as connection:
+                connection.execute(update, {'start': start, 'end': start + batch_size - 1})
@@ -0,0 +1,130 @@
+# database.py
+# Engine settings for DATABASE_URL, the way cache_backends.py handles CACHE_URL.
+#
+#   SQLite       every new connection runs the PRAGMAs in SQLITE_PRAGMAS:
+#                WAL (readers no longer block the writer), synchronous=NORMAL
+#                (fsync at checkpoints, not every commit; safe with WAL),
+#                busy_timeout (wait for the write lock instead of failing with
+#                "database is locked") and mmap_size (reads straight from the page cache).
+#   PostgreSQL   a QueuePool sized by DB_POOL_SIZE / DB_MAX_OVERFLOW, with
+#                pre-ping (drops connections the server closed) and recycle.
+#   Replicas     DATABASE_REPLICA_URLS="postgresql://r1/db,postgresql://r2/db"
+#                registers each replica as a bind ("replica_0", ...) with the
+#                same pool settings; routing.py sends reads to them.
+#
+# `flask db stress` compares the default SQLite settings with these ones under
+# concurrent readers and writers.
+import os
+import random
+import tempfile
+import threading
+import time
+from functools import partial
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
+from extensions import db
+
+SQLITE_PRAGMAS = {
+    'journal_mode': os.getenv('SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous': os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000)),      # milliseconds
+    'mmap_size': int(os.getenv('SQLITE_MMAP_SIZE', 256 * 1024 ** 2)),  # bytes
+}
+
+def pool_options():
+    """QueuePool settings for server databases (PostgreSQL, MySQL)."""
+    return {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),    # seconds to wait for a free connection
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),  # seconds before a connection is replaced
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', '1') == '1',
+    }
+
+def engine_config(url, replica_urls=''):
+    """Returns the Flask-SQLAlchemy settings for a DATABASE_URL and comma-separated replica URLs."""
+    url = url or 'sqlite:///bobcat.db'
+    sqlite = url.startswith('sqlite')
+    options = {} if sqlite else pool_options()
+    replicas = {f'replica_{i}': {'url': replica.strip(), **options}
+                for i, replica in enumerate(r for r in replica_urls.split(',') if r.strip())}
+    return {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': options,
+        'SQLALCHEMY_BINDS': replicas,
+        'SQLITE_PRAGMAS': dict(SQLITE_PRAGMAS) if sqlite else {},
+        'DATABASE_REPLICAS': list(replicas),
+    }
+
+def set_pragmas(pragmas, dbapi_connection, connection_record=None):
+    """Runs PRAGMA name=value for each setting on a new SQLite connection."""
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+def init_app(app):
+    """Applies SQLITE_PRAGMAS to every SQLite engine of `app`; call after db.init_app(app)."""
+    pragmas = app.config.get('SQLITE_PRAGMAS')
+    if not pragmas:
+        return
+    with app.app_context():
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', partial(set_pragmas, pragmas))
+
+# --- Stress Test ---
+
+def stress(pragmas, threads=8, seconds=5.0, write_ratio=0.2, rows=10_000, directory=None):
+    """Runs concurrent readers and writers against a scratch SQLite file in `directory`.
+
+    Each thread loops for `seconds`: a write inserts a like-sized row in its
+    own transaction, a read runs an indexed COUNT. Returns a dict with ops/s,
+    p99 latency in ms, and how many operations failed with "database is locked".
+    """
+    directory = directory or tempfile.mkdtemp()
+    engine = create_engine(f"sqlite:///{os.path.join(directory, 'stress.db')}",
+                           pool_size=threads, max_overflow=0)
+    if pragmas:
+        event.listen(engine, 'connect', partial(set_pragmas, pragmas))
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE item (id INTEGER PRIMARY KEY, user_id INTEGER, post_id INTEGER)'))
+        connection.execute(text('CREATE INDEX ix_item_post_id ON item (post_id)'))
+        connection.execute(text('INSERT INTO item (user_id, post_id) VALUES (:u, :p)'),
+                           [{'u': i % 500, 'p': i % 1000} for i in range(rows)])
+
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def worker(seed):
+        rng = random.Random(seed)
+        mine = []
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                if rng.random() < write_ratio:
+                    with engine.begin() as connection:
+                        connection.execute(text('INSERT INTO item (user_id, post_id) VALUES (:u, :p)'),
+                                           {'u': rng.randrange(500), 'p': rng.randrange(1000)})
+                else:
+                    with engine.connect() as connection:
+                        connection.execute(text('SELECT count(*) FROM item WHERE post_id = :p'),
+                                           {'p': rng.randrange(1000)}).scalar()
+            except OperationalError:
+                with lock:
+                    errors[0] += 1
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    engine.dispose()
+
+    latencies.sort()
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else 0.0
+    return {'ops_per_second': len(latencies) / seconds, 'p99_ms': p99, 'locked': errors[0]}
@@ -0,0 +1,90 @@
+# directory.py
+# Club directory: category facets, name prefix search and keyset paging,
+# behind /student/clubs and /student/api/clubs.
+#
+#   clubs, next_cursor = directory_page(category='Cultural', prefix='af')
+#   facets = facet_counts()   # [{'name': 'Academic', 'count': 41}, ...]
+#
+# Pages are ordered by (lower(name), id) and start after the previous page's
+# last club, so each page is a walk along ix_club_lower_name_id that stops
+# after DIRECTORY_PAGE_SIZE matches, however large the directory grows. A name
+# prefix becomes a range on the same index. Category filters and facet counts
+# are joins through club_category (see categories.py); the counts are cached
+# until a club changes (CLUBS_TAG).
+from sqlalchemy import and_, func, select, tuple_
+from extensions import db
+from models import Category, Club, club_category
+from categories import parse_categories
+from caching import get_or_build, CLUBS_TAG
+
+DIRECTORY_PAGE_SIZE = 50
+MAX_PREFIX = 50
+
+sort_name = func.lower(Club.name)
+
+def category_condition(category):
+    """Clubs listed under `category` (any case), via ix_club_category_category_id_club_id."""
+    return Club.id.in_(
+        select(club_category.c.club_id)
+        .join(Category, Category.id == club_category.c.category_id)
+        .where(func.lower(Category.name) == category.strip().lower())
+    )
+
+def prefix_condition(prefix):
+    """Case-insensitive name prefix, as a range on lower(name) so the index is used."""
+    prefix = prefix.lower()
+    upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    return and_(sort_name >= prefix, sort_name < upper)
+
+def encode_cursor(club):
+    return f"{club['id']}_{club['name'].lower()}"
+
+def decode_cursor(cursor):
+    """Returns (lower name, id) for a cursor, or None if it is missing or malformed."""
+    try:
+        club_id, name = cursor.split('_', 1)
+        return name, int(club_id)
+    except (AttributeError, ValueError):
+        return None
+
+def facet_counts():
+    """[{'name', 'count'}] for every category, most common first; cached until a club changes."""
+    def build():
+        count = func.count(club_category.c.club_id)
+        rows = db.session.execute(
+            select(Category.name, count)
+            .join(club_category, club_category.c.category_id == Category.id)
+            .group_by(Category.id, Category.name)
+            .order_by(count.desc(), Category.name)
+        ).all()
+        return [{'name': name, 'count': total} for name, total in rows], []
+    return get_or_build('clubs:facets', [CLUBS_TAG], build)
+
+def directory_page(category=None, prefix=None, cursor=None, per_page=DIRECTORY_PAGE_SIZE):
+    """Returns (clubs, next_cursor) for one page of the directory; clubs are plain dicts."""
+    prefix = (prefix or '').strip()[:MAX_PREFIX]
+
+    def build():
+        query = select(Club.id, Club.name, Club.slug, Club.category, Club.meeting_time, Club.location, Club.member_count)
+        if category:
+            query = query.where(category_condition(category))
+        if prefix:
+            query = query.where(prefix_condition(prefix))
+        position = decode_cursor(cursor)
+        if position:
+            query = query.where(tuple_(sort_name, Club.id) > tuple_(*position))
+        rows = db.session.execute(query.order_by(sort_name, Club.id).limit(per_page + 1)).all()
+        clubs = [{
+            'id': row.id,
+            'name': row.name,
+            'slug': row.slug,
+            'categories': parse_categories(row.category),
+            'meeting_time': row.meeting_time,
+            'location': row.location,
+            'member_count': row.member_count,
+        } for row in rows[:per_page]]
+        next_cursor = encode_cursor(clubs[-1]) if len(rows) > per_page else None
+        return (clubs, next_cursor), []
+
+    key = f'clubs:directory:{category or ""}:{prefix.lower()}:{cursor or ""}:{per_page}'
+    return get_or_build(key, [CLUBS_TAG], build)
@@ -3,8 +3,9 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager
 from flask_caching import Cache
+from routing import RoutingSession
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})  # reads may go to replicas (routing.py)
 bcrypt = Bcrypt()
 login_manager = LoginManager()
 cache = Cache()
\ No newline at end of file
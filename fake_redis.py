@@ -0,0 +1,237 @@
+# fake_redis.py
+# A small in-process server that speaks the Redis protocol (RESP2).
+# It implements the commands Flask-Caching's RedisCache uses, so the shared
+# cache path can be exercised without a real Redis:
+#
+#     server = FakeRedisServer().start()
+#     app.config['CACHE_URL'] = server.url
+#     ...
+#     server.stop()
+import fnmatch
+import socketserver
+import threading
+import time
+
+class FakeRedisServer:
+    """Serves one shared key space on 127.0.0.1 from a background thread."""
+
+    def __init__(self, port=0):
+        self.data = {}      # key (bytes) -> value (bytes)
+        self.expires = {}   # key (bytes) -> deadline (time.monotonic())
+        self.lock = threading.Lock()
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', port), _Handler)
+        self.server.daemon_threads = True
+        self.server.store = self
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        # protocol=2 stops RESP3-by-default clients from asking for HELLO 3
+        return f'redis://{host}:{port}/0?protocol=2'
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    # --- Key space ---
+
+    def _alive(self, key):
+        deadline = self.expires.get(key)
+        if deadline is not None and deadline <= time.monotonic():
+            self.data.pop(key, None)
+            self.expires.pop(key, None)
+        return key in self.data
+
+    def _set(self, key, value, ttl=None):
+        self.data[key] = value
+        if ttl:
+            self.expires[key] = time.monotonic() + ttl
+        else:
+            self.expires.pop(key, None)
+
+    def execute(self, command, args):
+        with self.lock:
+            handler = getattr(self, f'cmd_{command}', None)
+            if handler is None:
+                return ResponseError(f"ERR unknown command '{command}'")
+            try:
+                return handler(*args)
+            except (TypeError, ValueError):
+                return ResponseError(f"ERR wrong arguments for '{command}' command")
+
+    def cmd_ping(self, *args):
+        return args[0] if args else SimpleString('PONG')
+
+    def cmd_hello(self, *args):
+        # Newer redis-py clients open with HELLO; only RESP2 is spoken here
+        if args and args[0] != b'2':
+            return ResponseError('NOPROTO this server only speaks RESP2')
+        return [b'server', b'redis', b'version', b'7.0.0', b'proto', 2, b'mode', b'standalone']
+
+    def cmd_select(self, db):
+        return SimpleString('OK')
+
+    def cmd_client(self, *args):
+        return SimpleString('OK')
+
+    def cmd_get(self, key):
+        return self.data[key] if self._alive(key) else None
+
+    def cmd_mget(self, *keys):
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key, value, *options):
+        ttl, nx, xx = None, False, False
+        options = [option.upper() for option in options]
+        i = 0
+        while i < len(options):
+            if options[i] == b'EX':
+                ttl = int(options[i + 1]); i += 1
+            elif options[i] == b'PX':
+                ttl = int(options[i + 1]) / 1000; i += 1
+            elif options[i] == b'NX':
+                nx = True
+            elif options[i] == b'XX':
+                xx = True
+            i += 1
+        exists = self._alive(key)
+        if (nx and exists) or (xx and not exists):
+            return None
+        self._set(key, value, ttl)
+        return SimpleString('OK')
+
+    def cmd_setnx(self, key, value):
+        if self._alive(key):
+            return 0
+        self._set(key, value)
+        return 1
+
+    def cmd_setex(self, key, seconds, value):
+        self._set(key, value, int(seconds))
+        return SimpleString('OK')
+
+    def cmd_mset(self, *pairs):
+        for key, value in zip(pairs[::2], pairs[1::2]):
+            self._set(key, value)
+        return SimpleString('OK')
+
+    def cmd_del(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                del self.data[key]
+                self.expires.pop(key, None)
+                removed += 1
+        return removed
+
+    cmd_unlink = cmd_del
+
+    def cmd_exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def cmd_expire(self, key, seconds):
+        if not self._alive(key):
+            return 0
+        self.expires[key] = time.monotonic() + int(seconds)
+        return 1
+
+    def cmd_incrby(self, key, amount):
+        value = int(self.data[key]) + int(amount) if self._alive(key) else int(amount)
+        self.data[key] = str(value).encode()
+        return value
+
+    def cmd_incr(self, key):
+        return self.cmd_incrby(key, 1)
+
+    def cmd_decrby(self, key, amount):
+        return self.cmd_incrby(key, -int(amount))
+
+    def cmd_decr(self, key):
+        return self.cmd_incrby(key, -1)
+
+    def cmd_keys(self, pattern):
+        pattern = pattern.decode()
+        return [key for key in list(self.data) if self._alive(key) and fnmatch.fnmatchcase(key.decode(), pattern)]
+
+    def cmd_flushdb(self, *args):
+        self.data.clear()
+        self.expires.clear()
+        return SimpleString('OK')
+
+    cmd_flushall = cmd_flushdb
+
+class SimpleString(str):
+    pass
+
+class ResponseError(str):
+    pass
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Reads RESP commands off the socket and writes back RESP replies."""
+
+    def handle(self):
+        queued = None  # commands buffered between MULTI and EXEC
+        while True:
+            request = self._read()
+            if request is None:
+                return
+            if not isinstance(request, list) or not request:
+                self._write(ResponseError('ERR protocol error'))
+                continue
+            command, args = request[0].decode().lower(), request[1:]
+
+            if command == 'multi':
+                queued = []
+                reply = SimpleString('OK')
+            elif command == 'exec':
+                reply = [self.server.store.execute(c, a) for c, a in (queued or [])]
+                queued = None
+            elif command == 'discard':
+                queued = None
+                reply = SimpleString('OK')
+            elif queued is not None:
+                queued.append((command, args))
+                reply = SimpleString('QUEUED')
+            else:
+                reply = self.server.store.execute(command, args)
+            self._write(reply)
+
+    def _read(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        kind, body = line[:1], line[1:-2]
+        if kind == b'*':
+            return [self._read() for _ in range(int(body))]
+        if kind == b'$':
+            length = int(body)
+            if length < 0:
+                return None
+            data = self.rfile.read(length + 2)
+            return data[:-2]
+        # Inline command, e.g. "PING\r\n" typed into a telnet session
+        return line.strip().split()
+
+    def _write(self, reply):
+        self.wfile.write(_encode(reply))
+
+def _encode(reply):
+    if reply is None:
+        return b'$-1\r\n'
+    if isinstance(reply, ResponseError):
+        return f'-{reply}\r\n'.encode()
+    if isinstance(reply, SimpleString):
+        return f'+{reply}\r\n'.encode()
+    if isinstance(reply, int):
+        return f':{reply}\r\n'.encode()
+    if isinstance(reply, list):
+        return f'*{len(reply)}\r\n'.encode() + b''.join(_encode(item) for item in reply)
+    if isinstance(reply, str):
+        reply = reply.encode()
+    return b'$%d\r\n%s\r\n' % (len(reply), reply)
@@ -0,0 +1,73 @@
+# feed.py
+# Loading layer for the post feeds.
+# Pages are ordered by (created_at, id) descending, so fetching the next page
+# is an indexed range scan instead of an OFFSET that re-reads every earlier row.
+# Each card's club comes back in the same SELECT and like counts are a column
+# on Post, so a page costs one query no matter how many posts it holds.
+from datetime import datetime
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import contains_eager
+from models import Club, Post
+
+FEED_PAGE_SIZE = 20
+
+def encode_cursor(post):
+    """Turns the last post on a page into an opaque cursor string."""
+    return f"{post.created_at.isoformat()}_{post.id}"
+
+def decode_cursor(cursor):
+    """Returns (created_at, id) for a cursor, or None if it is missing or malformed."""
+    if not cursor:
+        return None
+    try:
+        created_at, post_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except ValueError:
+        return None
+
+def feed_query():
+    """Base query for feed cards: posts joined to their club."""
+    return Post.query.join(Club).options(contains_eager(Post.club))
+
+def post_card(post):
+    """Plain-data copy of a feed card, safe to cache and to render outside the session."""
+    return {
+        'id': post.id,
+        'club_id': post.club_id,
+        'club': {'id': post.club.id, 'name': post.club.name, 'slug': post.club.slug,
+                 'image_file': post.club.image_file},
+        'image_file': post.image_file,
+        'caption': post.caption,
+        'created_at': post.created_at,
+        'is_event': post.is_event,
+        'event_title': post.event_title,
+        'event_date': post.event_date,
+        'event_location': post.event_location,
+        'like_count': post.like_count,
+        'rsvp_count': post.rsvp_count,
+    }
+
+def after_cursor(query, cursor, created_at_column=Post.created_at, id_column=Post.id):
+    """Restricts a query to the rows that come after `cursor` in feed order."""
+    position = decode_cursor(cursor)
+    if not position:
+        return query
+    created_at, post_id = position
+    return query.filter(or_(
+        created_at_column < created_at,
+        and_(created_at_column == created_at, id_column < post_id)
+    ))
+
+def split_page(posts, per_page=FEED_PAGE_SIZE):
+    """Trims the extra row fetched past a page and returns (posts, next_cursor)."""
+    if len(posts) > per_page:
+        posts = posts[:per_page]
+        return posts, encode_cursor(posts[-1])
+    return posts, None
+
+def paginate(query, cursor=None, per_page=FEED_PAGE_SIZE):
+    """Returns (posts, next_cursor) for the page of a feed_query() that starts after `cursor`."""
+    query = after_cursor(query, cursor)
+    # Fetch one extra row to find out whether another page exists
+    posts = query.order_by(Post.created_at.desc(), Post.id.desc()).limit(per_page + 1).all()
+    return split_page(posts, per_page)
@@ -0,0 +1,102 @@
+# ical.py
+# iCalendar (RFC 5545) export of a student's RSVP'd events.
+# Calendar apps poll a subscription URL without logging in, so each user gets
+# a signed token in the URL instead of a session cookie:
+#
+#   /student/calendar/<token>.ics
+#
+# The token names the user and carries their User.calendar_secret, signed
+# with SECRET_KEY. reset_calendar_secret() gives the user a new secret, which
+# revokes every link issued before (a leaked URL stops working); rotating
+# the key revokes every subscription link of every user.
+import hmac
+import secrets
+from datetime import datetime, timezone
+from itsdangerous import BadSignature, URLSafeSerializer
+from flask import current_app
+from sqlalchemy import select, update
+from extensions import db
+from models import User
+from routing import primary
+
+PRODUCT_ID = '-//Bobcat Connect//RSVP Calendar//EN'
+EVENT_DURATION = 'PT1H'  # posts have no end time
+LINE_LIMIT = 75          # octets per line before folding
+
+def _serializer():
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt='rsvp-calendar')
+
+def _calendar_secret(user_id):
+    with primary():  # a reset must take effect at once, not once a replica catches up
+        return db.session.scalar(select(User.calendar_secret).where(User.id == user_id))
+
+def reset_calendar_secret(user_id):
+    """Gives the user a new calendar secret, revoking their old links. Returns it; the caller commits."""
+    secret = secrets.token_urlsafe(16)
+    db.session.execute(update(User).where(User.id == user_id).values(calendar_secret=secret))
+    return secret
+
+def calendar_token(user_id):
+    """The subscription token for `user_id`; the first call creates the secret, so the caller commits."""
+    secret = _calendar_secret(user_id) or reset_calendar_secret(user_id)
+    return _serializer().dumps([user_id, secret])
+
+def token_user_id(token):
+    """The user id a calendar token was issued for, or None if it is not valid or was revoked."""
+    try:
+        user_id, secret = _serializer().loads(token)
+    except (BadSignature, TypeError, ValueError):
+        return None  # tampered, or a link from before calendar secrets
+    current = _calendar_secret(user_id) if isinstance(user_id, int) and isinstance(secret, str) else None
+    if current is None or not hmac.compare_digest(current, secret):
+        return None
+    return user_id
+
+def escape(text):
+    return (text or '').replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,') \
+        .replace('\r\n', '\\n').replace('\n', '\\n')
+
+def fold(line):
+    """Splits a content line into LINE_LIMIT-octet pieces, continued with a leading space."""
+    data = line.encode('utf-8')
+    if len(data) <= LINE_LIMIT:
+        return line + '\r\n'
+    pieces, limit = [], LINE_LIMIT
+    while data:
+        cut = min(limit, len(data))
+        while cut < len(data) and (data[cut] & 0xC0) == 0x80:  # never split a UTF-8 character
+            cut -= 1
+        pieces.append(data[:cut].decode('utf-8'))
+        data, limit = data[cut:], LINE_LIMIT - 1
+    return '\r\n '.join(pieces) + '\r\n'
+
+def _timestamp(value):
+    return value.strftime('%Y%m%dT%H%M%S')
+
+def ics_lines(events, name, host, event_url):
+    """Yields the folded lines of a VCALENDAR, one VEVENT per row.
+
+    `events` are rows with id, event_title, event_date, event_location and
+    caption; `event_url(id)` gives each event's page. Dates are written as
+    floating local times, the way they were entered.
+    """
+    stamp = _timestamp(datetime.now(timezone.utc)) + 'Z'
+    yield fold('BEGIN:VCALENDAR')
+    yield fold('VERSION:2.0')
+    yield fold(f'PRODID:{PRODUCT_ID}')
+    yield fold('CALSCALE:GREGORIAN')
+    yield fold(f'X-WR-CALNAME:{escape(name)}')
+    for event in events:
+        yield fold('BEGIN:VEVENT')
+        yield fold(f'UID:post-{event.id}@{host}')
+        yield fold(f'DTSTAMP:{stamp}')
+        yield fold(f'DTSTART:{_timestamp(event.event_date)}')
+        yield fold(f'DURATION:{EVENT_DURATION}')
+        yield fold(f'SUMMARY:{escape(event.event_title)}')
+        if event.event_location:
+            yield fold(f'LOCATION:{escape(event.event_location)}')
+        if event.caption:
+            yield fold(f'DESCRIPTION:{escape(event.caption)}')
+        yield fold(f'URL:{event_url(event.id)}')
+        yield fold('END:VEVENT')
+    yield fold('END:VCALENDAR')
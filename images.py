@@ -0,0 +1,143 @@
+# images.py
+# Upload pipeline for post and club pictures.
+# Every upload is decoded and validated, rotated upright, stripped of metadata
+# (EXIF, GPS, ICC) and re-encoded as WebP and JPEG at three widths. Files are
+# named after a hash of the upload, so the same picture is only stored once:
+#
+#   static/posts/img_<hash>_thumb.webp   static/posts/img_<hash>_thumb.jpg
+#   static/posts/img_<hash>_feed.webp    static/posts/img_<hash>_feed.jpg
+#   static/posts/img_<hash>_full.webp    static/posts/img_<hash>_full.jpg
+#
+# The database stores only the base name ("img_<hash>"). Older rows hold a plain
+# file name such as "birds.jpg"; image_url() serves those unchanged.
+#
+# Views only run the cheap check_upload() and store the bytes with store_upload();
+# the "process_upload" job in jobs.py does the decoding and encoding.
+import hashlib
+import io
+import os
+import re
+from assets import asset_url
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+UPLOAD_DIR = 'static/posts'
+PENDING_DIR = 'pending_uploads'
+
+# Longest edge, in pixels, of each variant
+VARIANTS = {'thumb': 160, 'feed': 720, 'full': 1440}
+FORMATS = {'webp': ('WEBP', {'quality': 80, 'method': 4}), 'jpg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True})}
+
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+MAX_UPLOAD_BYTES = 15 * 1024 * 1024
+MAX_PIXELS = 40_000_000
+PROCESSED_NAME = re.compile(r'^img_[0-9a-f]{20}$')
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not an image we accept."""
+
+def is_processed(image_file):
+    return bool(image_file) and PROCESSED_NAME.match(image_file) is not None
+
+def check_upload(data):
+    """Cheap validation of raw upload bytes (headers only, no full decode); raises InvalidImage."""
+    if len(data) > MAX_UPLOAD_BYTES:
+        raise InvalidImage('Image is larger than 15 MB.')
+    try:
+        with Image.open(io.BytesIO(data)) as probe:
+            if probe.format not in ALLOWED_FORMATS:
+                raise InvalidImage('Upload a JPEG, PNG, GIF or WebP image.')
+            if probe.width * probe.height > MAX_PIXELS:
+                raise InvalidImage('Image dimensions are too large.')
+            probe.verify()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise InvalidImage('File is not a valid image.')
+
+def open_upload(data):
+    """Decodes and validates raw upload bytes, returning an upright RGB/RGBA image."""
+    check_upload(data)
+    try:
+        # verify() leaves the probed image unusable, so decode again for real
+        image = Image.open(io.BytesIO(data))
+        image.seek(0)  # first frame of animated GIF/WebP
+        image.load()
+    except (UnidentifiedImageError, OSError, SyntaxError, Image.DecompressionBombError):
+        raise InvalidImage('File is not a valid image.')
+
+    image = ImageOps.exif_transpose(image)
+    return image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+def encode_variants(image):
+    """Returns {(variant, ext): encoded bytes} for every size and format."""
+    encoded = {}
+    for variant, edge in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail((edge, edge), Image.Resampling.LANCZOS)
+        for ext, (fmt, options) in FORMATS.items():
+            frame = resized
+            if fmt == 'JPEG' and frame.mode == 'RGBA':
+                # JPEG has no alpha channel; flatten onto white
+                frame = Image.new('RGB', resized.size, (255, 255, 255))
+                frame.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            # No exif/icc_profile arguments: the output carries no metadata
+            frame.save(buffer, fmt, **options)
+            encoded[(variant, ext)] = buffer.getvalue()
+    return encoded
+
+def already_processed(base_name, root_path):
+    # The full-size JPEG is written last, so its presence means every variant exists
+    return os.path.exists(os.path.join(root_path, UPLOAD_DIR, f'{base_name}_full.jpg'))
+
+def process_image(data, root_path):
+    """Runs the pipeline on raw bytes and returns the base name to store on the row."""
+    base_name = 'img_' + hashlib.sha256(data).hexdigest()[:20]
+    directory = os.path.join(root_path, UPLOAD_DIR)
+    if already_processed(base_name, root_path):
+        return base_name  # identical upload already processed
+
+    encoded = encode_variants(open_upload(data))
+    for (variant, ext), content in encoded.items():
+        path = os.path.join(directory, f'{base_name}_{variant}.{ext}')
+        # Write then rename so a reader never sees a half-written file
+        with open(path + '.tmp', 'wb') as f:
+            f.write(content)
+        os.replace(path + '.tmp', path)
+    return base_name
+
+# --- Pending Uploads ---
+# Uploads wait in the instance folder (not under static/, since they still carry
+# their metadata) until a background job runs them through process_image().
+
+def store_upload(data, instance_path):
+    """Saves raw upload bytes for a background job and returns the name to pass it."""
+    directory = os.path.join(instance_path, PENDING_DIR)
+    os.makedirs(directory, exist_ok=True)
+    # Named by the same hash as the processed variants (see process_image)
+    name = hashlib.sha256(data).hexdigest() + '.upload'
+    path = os.path.join(directory, name)
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+    return name
+
+def pending_upload_path(name, instance_path):
+    return os.path.join(instance_path, PENDING_DIR, os.path.basename(name))
+
+def processed_name(upload_name):
+    """Base name process_image() gives the upload stored as `upload_name`."""
+    return 'img_' + upload_name[:20]
+
+# --- Template Helpers ---
+
+def image_url(image_file, variant='feed', ext='jpg'):
+    """Path under static/ for one variant of an image (legacy files are returned as-is)."""
+    if is_processed(image_file):
+        return f'posts/{image_file}_{variant}.{ext}'
+    return f'posts/{image_file}'
+
+def image_srcset(image_file, ext):
+    """srcset listing every width of a processed image in one format."""
+    return ', '.join(
+        f"{asset_url(image_url(image_file, variant, ext))} {edge}w"
+        for variant, edge in VARIANTS.items()
+    )
@@ -0,0 +1,108 @@
+# indexes.py
+# Index maintenance and query-plan checks for the hot queries.
+# db.create_all() only builds indexes for tables it creates, so databases made
+# before an index was added to models.py get it from create_missing_indexes().
+import re
+from datetime import datetime, timezone
+from sqlalchemy import text
+from sqlalchemy.schema import CreateIndex
+from sqlalchemy.orm import contains_eager
+from extensions import db
+from models import Club, Post, RSVP, ClubFollower, PostLike, TimelineEntry, club_category
+
+def _index_names(connection, inspector, table_name):
+    if connection.dialect.name == 'sqlite':
+        # SQLAlchemy does not reflect SQLite expression indexes, so ask sqlite_master
+        return set(connection.scalars(text(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"
+        ), {'table': table_name}))
+    return {ix['name'] for ix in inspector.get_indexes(table_name)}
+
+def create_missing_indexes(engine):
+    """Creates every index declared in models.py that the database does not have yet.
+
+    On PostgreSQL the indexes are built CONCURRENTLY, so writes keep flowing
+    while they build; that has to happen outside a transaction.
+    """
+    with engine.connect() as connection:
+        inspector = db.inspect(connection)
+        missing = []
+        for table in db.metadata.sorted_tables:
+            existing = _index_names(connection, inspector, table.name)
+            missing += [index for index in table.indexes if index.name not in existing]
+
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for index in missing:
+                statement = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+                statement = re.sub(r'^CREATE (UNIQUE )?INDEX', r'CREATE \1INDEX CONCURRENTLY', statement)
+                connection.exec_driver_sql(statement)
+    else:
+        with engine.begin() as connection:
+            for index in missing:
+                index.create(connection)
+    return [index.name for index in missing]
+
+def hot_queries():
+    """The statements behind the busiest pages, keyed by a short label."""
+    now = datetime.now(timezone.utc)
+    return {
+        'global feed page': Post.query.join(Club).options(contains_eager(Post.club))
+            .filter(Club.verified == True)
+            .order_by(Post.created_at.desc(), Post.id.desc()).limit(21),
+        'following feed page': Post.query.join(Club).options(contains_eager(Post.club))
+            .filter(Post.club_id.in_([1, 2, 3]))
+            .order_by(Post.created_at.desc(), Post.id.desc()).limit(21),
+        'following timeline page': Post.query.join(Club).options(contains_eager(Post.club))
+            .join(TimelineEntry, (TimelineEntry.post_id == Post.id) & (TimelineEntry.user_id == 1))
+            .filter(TimelineEntry.created_at >= now)
+            .order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc()).limit(21),
+        'club by slug': Club.query.filter(Club.slug == 'chess-club'),
+        'club page validators': db.session.query(db.func.max(Post.updated_at)).filter(Post.club_id == 1),
+        'club directory page': Club.query.filter(db.func.lower(Club.name) >= 'ch', db.func.lower(Club.name) < 'ci')
+            .order_by(db.func.lower(Club.name), Club.id).limit(51),
+        'club directory category': Club.query.filter(Club.id.in_(
+                db.select(club_category.c.club_id).filter(club_category.c.category_id == 1)))
+            .order_by(db.func.lower(Club.name), Club.id).limit(51),
+        'club upcoming events': Post.query.filter(
+            Post.club_id == 1, Post.is_event == True, Post.event_date >= now
+        ).order_by(Post.event_date),
+        'club followers': ClubFollower.query.filter_by(club_id=1),
+        'post rsvps': RSVP.query.filter_by(post_id=1),
+        'post likes': PostLike.query.filter_by(post_id=1),
+        'club by owner': Club.query.filter_by(owner_id=1),
+    }
+
+def explain(connection, query):
+    """Returns the database's plan for an ORM query as a list of lines."""
+    compiled = query.statement.compile(dialect=connection.dialect,
+                                       compile_kwargs={'render_postcompile': True})
+    if connection.dialect.name == 'postgresql':
+        rows = connection.exec_driver_sql('EXPLAIN ' + str(compiled), compiled.params)
+        return [row[0] for row in rows]
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    rows = connection.exec_driver_sql('EXPLAIN QUERY PLAN ' + str(compiled), params)
+    return [row[-1] for row in rows]
+
+def reads_whole_table(connection, plan):
+    """True when a plan has to visit every row of a table to answer the query."""
+    if connection.dialect.name == 'postgresql':
+        return any('Seq Scan' in line for line in plan)
+    scans = [line for line in plan if line.startswith('SCAN ')]
+    if any('INDEX' not in line for line in scans):
+        return True
+    # SCAN ... USING INDEX is only cheap when the index also gives the ORDER BY,
+    # so LIMIT can stop early; with a temp b-tree every row is read and sorted
+    return bool(scans) and any('TEMP B-TREE FOR ORDER BY' in line for line in plan)
+
+def check_query_plans(connection):
+    """Returns {label: plan lines} for every hot query that falls back to a table scan."""
+    if connection.dialect.name == 'postgresql':
+        # Small tables are cheaper to scan; ask whether an index could be used at all
+        connection.execute(text('SET LOCAL enable_seqscan = off'))
+    regressions = {}
+    for label, query in hot_queries().items():
+        plan = explain(connection, query)
+        if reads_whole_table(connection, plan):
+            regressions[label] = plan
+    return regressions
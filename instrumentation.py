@@ -0,0 +1,196 @@
+# instrumentation.py
+# Per-request query counts and timings, reported three ways:
+#
+#   Server-Timing header   db;dur=12.3;desc="5 queries", tpl;dur=3.1, total;dur=21.0
+#                          (shown per request in the browser's network panel)
+#   structured log line    one JSON object per request on the "bobcat.requests" logger,
+#                          at WARNING when a page runs more than QUERY_WARNING queries
+#   GET /metrics           Prometheus text format, totals per endpoint since start;
+#                          scrapers send `Authorization: Bearer $METRICS_TOKEN`, and
+#                          without METRICS_TOKEN only logged-in admins can read it
+#
+# Queries are timed with SQLAlchemy cursor events, templates with Flask's
+# render signals. Metrics live in the worker process, so with several workers
+# each one is scraped separately.
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import abort, current_app, g, has_app_context, request, before_render_template, template_rendered
+from flask_login import current_user
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+QUERY_WARNING = 20  # a page above this many queries is probably an N+1
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)  # seconds
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+log = logging.getLogger('bobcat.requests')
+
+def _stats():
+    """The current request's stats dict, or None outside a request being measured."""
+    return g.get('request_stats') if has_app_context() else None
+
+# --- SQL ---
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_execute(connection, cursor, statement, parameters, context, executemany):
+    connection.info.setdefault('query_started', []).append(time.perf_counter())
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_execute(connection, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - connection.info['query_started'].pop()
+    stats = _stats()
+    if stats is None:
+        return
+    stats['queries'] += 1
+    stats['db'] += elapsed
+    if elapsed > stats['slowest'][0]:
+        stats['slowest'] = (elapsed, statement)
+
+# --- Templates ---
+
+def _before_render(app, template, context, **extra):
+    stats = _stats()
+    if stats is not None:
+        stats['render_started'].append(time.perf_counter())
+
+def _after_render(app, template, context, **extra):
+    stats = _stats()
+    if stats is not None and stats['render_started']:
+        elapsed = time.perf_counter() - stats['render_started'].pop()
+        if not stats['render_started']:  # count nested render_template calls once
+            stats['templates'] += elapsed
+
+# --- Metrics ---
+
+class Metrics:
+    """Counters and histograms per endpoint, rendered in Prometheus text format."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = {}    # (endpoint, method, status) -> count
+        self.durations = {}   # endpoint -> [bucket counts..., sum, count]
+        self.queries = {}     # endpoint -> [bucket counts..., sum, count]
+        self.db_seconds = {}  # endpoint -> seconds
+        self.template_seconds = {}
+
+    @staticmethod
+    def _observe(histograms, key, buckets, value):
+        histogram = histograms.setdefault(key, [0] * (len(buckets) + 2))
+        histogram[bisect_left(buckets, value)] += 1  # the last bucket slot is +Inf
+        histogram[-2] += value
+        histogram[-1] += 1
+
+    def record(self, endpoint, method, status, seconds, stats):
+        with self.lock:
+            key = (endpoint, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self._observe(self.durations, endpoint, DURATION_BUCKETS, seconds)
+            self._observe(self.queries, endpoint, QUERY_BUCKETS, stats['queries'])
+            self.db_seconds[endpoint] = self.db_seconds.get(endpoint, 0.0) + stats['db']
+            self.template_seconds[endpoint] = self.template_seconds.get(endpoint, 0.0) + stats['templates']
+
+    @staticmethod
+    def _histogram_lines(name, histograms, buckets):
+        lines = []
+        for endpoint, values in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], values[:-2]):
+                cumulative += count
+                lines.append(f'{name}_bucket{{endpoint="{endpoint}",le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_sum{{endpoint="{endpoint}"}} {values[-2]:.6f}')
+            lines.append(f'{name}_count{{endpoint="{endpoint}"}} {values[-1]}')
+        return lines
+
+    def render(self):
+        with self.lock:
+            lines = ['# HELP bobcat_requests_total HTTP requests handled.',
+                     '# TYPE bobcat_requests_total counter']
+            lines += [f'bobcat_requests_total{{endpoint="{e}",method="{m}",status="{s}"}} {n}'
+                      for (e, m, s), n in sorted(self.requests.items())]
+            lines += ['# HELP bobcat_request_duration_seconds Time to build each response.',
+                      '# TYPE bobcat_request_duration_seconds histogram']
+            lines += self._histogram_lines('bobcat_request_duration_seconds', self.durations, DURATION_BUCKETS)
+            lines += ['# HELP bobcat_db_queries_per_request SQL statements run per request.',
+                      '# TYPE bobcat_db_queries_per_request histogram']
+            lines += self._histogram_lines('bobcat_db_queries_per_request', self.queries, QUERY_BUCKETS)
+            lines += ['# HELP bobcat_db_seconds_total Time spent in SQL statements.',
+                      '# TYPE bobcat_db_seconds_total counter']
+            lines += [f'bobcat_db_seconds_total{{endpoint="{e}"}} {s:.6f}' for e, s in sorted(self.db_seconds.items())]
+            lines += ['# HELP bobcat_template_seconds_total Time spent rendering templates.',
+                      '# TYPE bobcat_template_seconds_total counter']
+            lines += [f'bobcat_template_seconds_total{{endpoint="{e}"}} {s:.6f}'
+                      for e, s in sorted(self.template_seconds.items())]
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
+
+# --- Request Hooks ---
+
+def _start_request():
+    g.request_stats = {
+        'started': time.perf_counter(), 'queries': 0, 'db': 0.0,
+        'slowest': (0.0, None), 'templates': 0.0, 'render_started': [],
+    }
+
+def _finish_request(response):
+    stats = _stats()
+    if stats is None:
+        return response
+    total = time.perf_counter() - stats['started']
+    endpoint = request.endpoint or 'unmatched'  # 404s share one label
+
+    if current_app.config.get('SERVER_TIMING', True):
+        response.headers.add('Server-Timing', ', '.join([
+            f'db;dur={stats["db"] * 1000:.1f};desc="{stats["queries"]} queries"',
+            f'tpl;dur={stats["templates"] * 1000:.1f}',
+            f'total;dur={total * 1000:.1f}',
+        ]))
+
+    slowest_seconds, slowest_statement = stats['slowest']
+    log.log(logging.WARNING if stats['queries'] > QUERY_WARNING else logging.INFO, json.dumps({
+        'method': request.method,
+        'path': request.path,
+        'endpoint': endpoint,
+        'status': response.status_code,
+        'duration_ms': round(total * 1000, 2),
+        'queries': stats['queries'],
+        'db_ms': round(stats['db'] * 1000, 2),
+        'template_ms': round(stats['templates'] * 1000, 2),
+        'slowest_query_ms': round(slowest_seconds * 1000, 2),
+        'slowest_query': ' '.join(slowest_statement.split())[:300] if slowest_statement else None,
+    }))
+    if endpoint != 'metrics':
+        metrics.record(endpoint, request.method, response.status_code, total, stats)
+    return response
+
+def metrics_view():
+    """Prometheus scrape endpoint for `Authorization: Bearer $METRICS_TOKEN`, or for admins when no token is set."""
+    token = os.getenv('METRICS_TOKEN')
+    if token:
+        allowed = hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+    else:
+        # Per-route timings and query counts are not public
+        allowed = current_user.is_authenticated and current_user.role == 'admin'
+    if not allowed:
+        abort(403)
+    return metrics.render(), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+def init_app(app):
+    """Measures every request of `app` and registers GET /metrics."""
+    if not log.handlers:
+        # One JSON object per line, ready for a log shipper
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(app.config.get('REQUEST_LOG_LEVEL', 'INFO'))
+    app.before_request(_start_request)
+    app.after_request(_finish_request)
+    before_render_template.connect(_before_render, app)
+    template_rendered.connect(_after_render, app)
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
@@ -0,0 +1,97 @@
+# interactions.py
+# Likes and RSVPs written in batches.
+# The feed sends "intents" -- the state the user wants, not a toggle -- so a
+# batch can be retried or replayed without flipping anything twice:
+#
+#   [{"kind": "like", "post_id": 12, "state": true},
+#    {"kind": "rsvp", "post_id": 7, "state": false}]
+#
+# apply_intents() keeps the last intent per (kind, post), then runs a fixed
+# number of set-based statements however many posts are in the batch: one
+# multi-row INSERT ... ON CONFLICT DO NOTHING and one DELETE per kind, with
+# RETURNING telling which rows really changed, so the counters are only
+# bumped for those.
+from sqlalchemy import delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Post, PostLike, RSVP
+import counters
+
+MAX_INTENTS = 100  # per request; the feed flushes far fewer
+
+# kind -> (link model, counter column)
+KINDS = {
+    'like': (PostLike, Post.like_count),
+    'rsvp': (RSVP, Post.rsvp_count),
+}
+
+class InvalidIntent(ValueError):
+    pass
+
+def parse_intents(data):
+    """Validates a request body into [(kind, post_id, state)]; raises InvalidIntent."""
+    intents = data.get('intents') if isinstance(data, dict) else None
+    if not isinstance(intents, list) or not intents:
+        raise InvalidIntent('Expected a non-empty "intents" list.')
+    if len(intents) > MAX_INTENTS:
+        raise InvalidIntent(f'At most {MAX_INTENTS} intents per request.')
+    parsed = []
+    for intent in intents:
+        if not isinstance(intent, dict) or intent.get('kind') not in KINDS \
+                or type(intent.get('post_id')) is not int or type(intent.get('state')) is not bool:
+            raise InvalidIntent('Each intent needs a kind ("like" or "rsvp"), an integer post_id and a boolean state.')
+        parsed.append((intent['kind'], intent['post_id'], intent['state']))
+    return parsed
+
+def _insert(table):
+    dialect = postgresql if db.engine.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table)
+
+def apply_intents(user_id, intents):
+    """Brings the user's likes and RSVPs to the wanted states; the caller commits.
+
+    Returns (states, changed_post_ids), where states maps each existing post
+    to {'liked', 'likes_count', 'rsvp', 'rsvp_count'} after the change.
+    RSVP intents for posts that are not events are ignored.
+    """
+    wanted = {(kind, post_id): state for kind, post_id, state in intents}  # last intent wins
+    is_event = dict(db.session.execute(
+        select(Post.id, Post.is_event).where(Post.id.in_({post_id for _, post_id in wanted}))
+    ).all())
+
+    changed = set()
+    for kind, (model, column) in KINDS.items():
+        table = model.__table__
+        targets = [(post_id, state) for (k, post_id), state in wanted.items()
+                   if k == kind and post_id in is_event and (kind != 'rsvp' or is_event[post_id])]
+        add = [post_id for post_id, state in targets if state]
+        remove = [post_id for post_id, state in targets if not state]
+
+        if add:
+            statement = _insert(table).values([{'user_id': user_id, 'post_id': post_id} for post_id in add]) \
+                .on_conflict_do_nothing(index_elements=['user_id', 'post_id']).returning(table.c.post_id)
+            added = db.session.scalars(statement).all()
+            counters.adjust_many(column, added, 1)
+            changed.update(added)
+        if remove:
+            statement = delete(table).where(table.c.user_id == user_id, table.c.post_id.in_(remove)) \
+                .returning(table.c.post_id)
+            removed = db.session.scalars(statement).all()
+            counters.adjust_many(column, removed, -1)
+            changed.update(removed)
+
+    return post_states(user_id, is_event), changed
+
+def post_states(user_id, post_ids):
+    """{post_id: {'liked', 'likes_count', 'rsvp', 'rsvp_count'}} for the given posts, in three queries."""
+    post_ids = list(post_ids)
+    if not post_ids:
+        return {}
+    liked = set(db.session.scalars(
+        select(PostLike.post_id).where(PostLike.user_id == user_id, PostLike.post_id.in_(post_ids))))
+    going = set(db.session.scalars(
+        select(RSVP.post_id).where(RSVP.user_id == user_id, RSVP.post_id.in_(post_ids))))
+    rows = db.session.execute(
+        select(Post.id, Post.like_count, Post.rsvp_count).where(Post.id.in_(post_ids))).all()
+    return {row.id: {'liked': row.id in liked, 'likes_count': row.like_count,
+                     'rsvp': row.id in going, 'rsvp_count': row.rsvp_count} for row in rows}
@@ -0,0 +1,185 @@
+# jobs.py
+# A small background job queue stored in the application database.
+# Views enqueue work in the same transaction as the rows it belongs to, and
+# `flask jobs work` runs it outside the request:
+#
+#   enqueue('process_upload', model='Post', row_id=post.id, upload=name)
+#   db.session.commit()
+#
+# Failed jobs are retried with exponential backoff; after max_attempts they move
+# to the dead_job table, where `flask jobs retry-dead` can requeue them. A job
+# whose worker died mid-run is requeued once its lock is older than LOCK_TIMEOUT.
+# The job and dead_job tables are the Job and DeadJob models in models.py.
+#
+# Tasks run in the worker process, so cache invalidation only reaches the web
+# workers through a shared cache backend (CACHE_URL=shm://, file:// or redis://).
+import os
+import socket
+import threading
+import time
+import traceback
+from datetime import datetime, timedelta, timezone
+from flask import current_app
+from extensions import db
+from models import Job, DeadJob
+
+RETRY_BASE_SECONDS = 10  # 10s, 20s, 40s, 80s, ...
+LOCK_TIMEOUT = timedelta(minutes=10)
+
+# Tasks that re-enqueue themselves after each run: name -> seconds between runs
+PERIODIC = {'reconcile_counters': 3600, 'repair_timelines': 3600}
+
+TASKS = {}
+
+def _now():
+    # Naive UTC, matching how DateTime columns round-trip on SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+def task(name):
+    """Registers a function as the handler for jobs called `name`."""
+    def register(func):
+        TASKS[name] = func
+        return func
+    return register
+
+def enqueue(name, delay=0, **payload):
+    """Adds a job to the session; it becomes visible to workers when the caller commits."""
+    job = Job(name=name, payload=payload, run_at=_now() + timedelta(seconds=delay))
+    db.session.add(job)
+    return job
+
+# --- Worker ---
+
+def claim(worker_id):
+    """Marks the oldest runnable job as running for this worker and returns it (or None)."""
+    while True:
+        # FOR UPDATE SKIP LOCKED lets PostgreSQL workers pass over each other's
+        # candidates; SQLite ignores it and serializes the UPDATE below instead
+        job_id = db.session.scalar(
+            db.select(Job.id).where(Job.status == 'queued', Job.run_at <= _now())
+            .order_by(Job.run_at, Job.id).limit(1).with_for_update(skip_locked=True)
+        )
+        if job_id is None:
+            db.session.rollback()
+            return None
+        claimed = db.session.query(Job).filter(Job.id == job_id, Job.status == 'queued').update({
+            Job.status: 'running', Job.locked_by: worker_id, Job.locked_at: _now(),
+            Job.attempts: Job.attempts + 1,
+        }, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return db.session.get(Job, job_id)
+        # Another worker took it between the SELECT and the UPDATE; try the next one
+
+def run(job, log=print):
+    """Runs one claimed job, then deletes it, schedules a retry or dead-letters it."""
+    job_id, name, payload = job.id, job.name, dict(job.payload)
+    try:
+        TASKS[name](**payload)
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        job = db.session.get(Job, job_id)
+        if job.attempts >= job.max_attempts:
+            db.session.add(DeadJob(name=name, payload=payload, attempts=job.attempts,
+                                   last_error=error, created_at=job.created_at))
+            db.session.delete(job)
+            log(f"   ! job {job_id} {name} failed {job.attempts} times; moved to dead_job")
+        else:
+            job.status, job.locked_by, job.locked_at = 'queued', None, None
+            job.run_at = _now() + timedelta(seconds=RETRY_BASE_SECONDS * 2 ** (job.attempts - 1))
+            job.last_error = error
+            log(f"   ! job {job_id} {name} failed (attempt {job.attempts}); retrying at {job.run_at:%H:%M:%S}")
+        db.session.commit()
+        return False
+
+    db.session.delete(db.session.get(Job, job_id))
+    if name in PERIODIC:
+        enqueue(name, delay=PERIODIC[name], **payload)
+    db.session.commit()
+    return True
+
+def requeue_stale():
+    """Puts jobs back in the queue whose worker stopped without finishing them."""
+    requeued = db.session.query(Job).filter(
+        Job.status == 'running', Job.locked_at < _now() - LOCK_TIMEOUT
+    ).update({Job.status: 'queued', Job.locked_by: None, Job.locked_at: None}, synchronize_session=False)
+    db.session.commit()
+    return requeued
+
+def schedule_periodic():
+    """Makes sure every periodic task has a job waiting; call once before starting workers."""
+    for name in PERIODIC:
+        if not db.session.query(Job.id).filter(Job.name == name).first():
+            enqueue(name)
+    db.session.commit()
+
+def work(burst=False, poll_interval=1.0, log=print):
+    """Processes jobs until stopped; with burst=True, returns once the queue is empty."""
+    worker_id = f'{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}'
+    processed = 0
+    requeue_stale()
+    while True:
+        job = claim(worker_id)
+        if job is None:
+            if burst:
+                return processed
+            requeue_stale()
+            time.sleep(poll_interval)
+            continue
+        run(job, log)
+        processed += 1
+
+def retry_dead():
+    """Moves every dead job back into the queue with a fresh set of attempts."""
+    dead = DeadJob.query.all()
+    for job in dead:
+        db.session.add(Job(name=job.name, payload=job.payload, created_at=job.created_at))
+        db.session.delete(job)
+    db.session.commit()
+    return len(dead)
+
+# --- Tasks ---
+
+@task('process_upload')
+def process_upload(model, row_id, upload):
+    """Runs a pending upload through the image pipeline and points the row at the result."""
+    from images import InvalidImage, already_processed, pending_upload_path, process_image, processed_name
+    from models import Club, Post
+    from caching import invalidate, CLUBS_TAG, club_tag, post_tag
+
+    path = pending_upload_path(upload, current_app.instance_path)
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            image_file = process_image(data, current_app.root_path)
+        except InvalidImage:
+            image_file = None  # passed the upload-time check but does not decode; keep the old picture
+    else:
+        # An earlier attempt, or the job for an identical upload, already processed it
+        image_file = processed_name(upload)
+        if not already_processed(image_file, current_app.root_path):
+            image_file = None
+
+    row = db.session.get({'Post': Post, 'Club': Club}[model], row_id)
+    if row is not None and image_file:
+        row.image_file = image_file
+        db.session.commit()
+        if model == 'Post':
+            invalidate(post_tag(row.id), club_tag(row.club_id))
+        else:
+            invalidate(CLUBS_TAG)
+    if os.path.exists(path):
+        os.remove(path)
+
+@task('reconcile_counters')
+def reconcile_counters():
+    from counters import reconcile
+    reconcile()
+
+@task('repair_timelines')
+def repair_timelines():
+    from timeline import repair_timelines
+    with db.engine.begin() as connection:
+        repair_timelines(connection)
@@ -0,0 +1,336 @@
+# migrations.py
+# Versioned schema migrations, applied with `flask db upgrade`.
+# Each step runs once, in order, and its version is recorded in schema_version.
+# Steps must be safe to re-run (check before adding) and safe while the site is
+# up: no long table locks, backfills in small batches, indexes built
+# CONCURRENTLY on PostgreSQL.
+#
+# Steps are frozen: each one spells out the tables, columns and indexes it adds
+# (the Table definitions below, ALTER TABLE and CREATE INDEX statements), so a
+# database from any older version upgrades the same way today as it did when
+# the step was written. Never create tables or indexes from models.py in a
+# step, and never backfill with an UPDATE built from a model: its defaults and
+# onupdates may name columns that only a later step adds. Backfills that need
+# application logic (search, categories, slugs) call into their module, which
+# runs plain SQL over columns that exist at that version.
+#
+# To change the schema: update models.py, then append a step to MIGRATIONS that
+# brings an existing database to the same shape.
+from datetime import datetime, timezone
+from sqlalchemy import (Boolean, Column, DateTime, ForeignKey, Integer, JSON, MetaData, String, Table,
+                        Text, UniqueConstraint, bindparam, text)
+from extensions import db
+import categories
+import counters
+import search
+import slugs
+import timeline
+
+schema_version = db.Table(
+    'schema_version',
+    db.Column('version', db.Integer, primary_key=True),
+    db.Column('description', db.String(200), nullable=False),
+    db.Column('applied_at', db.DateTime, nullable=False),
+)
+
+# --- Helpers ---
+
+def add_column_if_missing(engine, table_name, column_name, ddl):
+    """ALTER TABLE ... ADD COLUMN unless the column already exists."""
+    with engine.begin() as connection:
+        columns = {column['name'] for column in db.inspect(connection).get_columns(table_name)}
+        if column_name not in columns:
+            connection.execute(text(f'ALTER TABLE "{table_name}" ADD COLUMN {column_name} {ddl}'))
+
+def create_indexes(engine, statements):
+    """Runs each CREATE [UNIQUE] INDEX statement unless that index exists already.
+
+    Steps list their own indexes instead of reading models.py, which may
+    declare indexes on columns a later step adds. On PostgreSQL the indexes
+    are built CONCURRENTLY, so writes keep flowing while they build; that has
+    to happen outside a transaction.
+    """
+    if engine.dialect.name == 'postgresql':
+        with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+            for statement in statements:
+                connection.execute(text(statement.replace(' INDEX ', ' INDEX CONCURRENTLY IF NOT EXISTS ', 1)))
+    else:
+        with engine.begin() as connection:
+            for statement in statements:
+                connection.execute(text(statement.replace(' INDEX ', ' INDEX IF NOT EXISTS ', 1)))
+
+# --- Frozen Tables ---
+# Each table as the step that creates it first defined it. Later steps change
+# them with ALTER TABLE, never by editing these.
+
+frozen = MetaData()
+
+# 1: the schema the app had before migrations existed
+USER = Table(
+    'user', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('email', String(150), nullable=False, unique=True),
+    Column('password_hash', String(200), nullable=False),
+    Column('role', String(20), nullable=False),
+)
+
+CLUB = Table(
+    'club', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(150), nullable=False, unique=True),
+    Column('category', String(100)),
+    Column('description', Text),
+    Column('verified', Boolean),
+    Column('officer_verified', Boolean),
+    Column('image_file', String(120), nullable=False),
+    Column('owner_id', Integer, ForeignKey('user.id')),
+    Column('meeting_time', String(100)),
+    Column('location', String(100)),
+    Column('member_count', Integer),
+)
+
+POST = Table(
+    'post', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('club_id', Integer, ForeignKey('club.id'), nullable=False),
+    Column('image_file', String(120), nullable=False),
+    Column('caption', Text),
+    Column('created_at', DateTime),
+    Column('is_event', Boolean),
+    Column('event_title', String(100)),
+    Column('event_date', DateTime),
+    Column('event_location', String(100)),
+)
+
+RSVP = Table(
+    'rsvp', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('post_id', Integer, ForeignKey('post.id'), nullable=False),
+    UniqueConstraint('user_id', 'post_id'),
+)
+
+CLUB_FOLLOWER = Table(
+    'club_follower', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('club_id', Integer, ForeignKey('club.id'), nullable=False),
+    UniqueConstraint('user_id', 'club_id'),
+)
+
+POST_LIKE = Table(
+    'post_like', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('user_id', Integer, ForeignKey('user.id'), nullable=False),
+    Column('post_id', Integer, ForeignKey('post.id'), nullable=False),
+    UniqueConstraint('user_id', 'post_id'),
+)
+
+# 5
+JOB = Table(
+    'job', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('payload', JSON, nullable=False),
+    Column('status', String(20), nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('max_attempts', Integer, nullable=False),
+    Column('run_at', DateTime, nullable=False),
+    Column('locked_by', String(100)),
+    Column('locked_at', DateTime),
+    Column('last_error', Text),
+    Column('created_at', DateTime, nullable=False),
+)
+
+DEAD_JOB = Table(
+    'dead_job', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('payload', JSON, nullable=False),
+    Column('attempts', Integer, nullable=False),
+    Column('last_error', Text),
+    Column('created_at', DateTime, nullable=False),
+    Column('failed_at', DateTime, nullable=False),
+)
+
+# 6
+TIMELINE_ENTRY = Table(
+    'timeline_entry', frozen,
+    Column('user_id', Integer, ForeignKey('user.id'), primary_key=True),
+    Column('created_at', DateTime, primary_key=True),
+    Column('post_id', Integer, ForeignKey('post.id'), primary_key=True),
+    Column('club_id', Integer, ForeignKey('club.id'), nullable=False),
+)
+
+# 9
+CATEGORY = Table(
+    'category', frozen,
+    Column('id', Integer, primary_key=True),
+    Column('name', String(100), nullable=False, unique=True),
+)
+
+CLUB_CATEGORY = Table(
+    'club_category', frozen,
+    Column('club_id', Integer, ForeignKey('club.id'), primary_key=True),
+    Column('category_id', Integer, ForeignKey('category.id'), primary_key=True),
+)
+
+# 10
+CLUB_REDIRECT = Table(
+    'club_redirect', frozen,
+    Column('slug', String(160), primary_key=True),
+    Column('club_id', Integer, ForeignKey('club.id'), nullable=False),
+)
+
+# --- Steps ---
+
+def initial_schema(engine):
+    """The tables the app created before migrations existed, unless they are there already."""
+    for table in (USER, CLUB, POST, RSVP, CLUB_FOLLOWER, POST_LIKE):
+        table.create(engine, checkfirst=True)
+
+def counter_columns(engine):
+    """Post.like_count, Post.rsvp_count and Club.follower_count."""
+    # A constant default makes ADD COLUMN a metadata-only change on PostgreSQL 11+
+    add_column_if_missing(engine, 'post', 'like_count', "INTEGER NOT NULL DEFAULT 0")
+    add_column_if_missing(engine, 'post', 'rsvp_count', "INTEGER NOT NULL DEFAULT 0")
+    add_column_if_missing(engine, 'club', 'follower_count', "INTEGER NOT NULL DEFAULT 0")
+    counters.backfill(engine)
+
+def hot_query_indexes(engine):
+    """Composite indexes for the feed, club pages and per-post lookups."""
+    create_indexes(engine, [
+        "CREATE INDEX ix_post_created_at_id ON post (created_at, id)",
+        "CREATE INDEX ix_post_club_id_created_at ON post (club_id, created_at)",
+        "CREATE INDEX ix_post_club_id_is_event_event_date ON post (club_id, is_event, event_date)",
+        "CREATE INDEX ix_club_owner_id ON club (owner_id)",
+        "CREATE INDEX ix_rsvp_post_id ON rsvp (post_id)",
+        "CREATE INDEX ix_club_follower_club_id ON club_follower (club_id)",
+        "CREATE INDEX ix_post_like_post_id ON post_like (post_id)",
+    ])
+
+def full_text_search(engine):
+    """FTS5 (SQLite) or tsvector (PostgreSQL) search tables, filled from existing rows."""
+    with engine.begin() as connection:
+        search.rebuild_search_index(connection)
+
+def job_queue(engine):
+    """job and dead_job tables for the background queue."""
+    JOB.create(engine, checkfirst=True)
+    DEAD_JOB.create(engine, checkfirst=True)
+    create_indexes(engine, [
+        "CREATE INDEX ix_job_status_run_at ON job (status, run_at)",
+    ])
+
+def following_timelines(engine):
+    """timeline_entry table, filled with the recent posts of every followed club."""
+    TIMELINE_ENTRY.create(engine, checkfirst=True)
+    create_indexes(engine, [
+        "CREATE INDEX ix_timeline_entry_created_at ON timeline_entry (created_at)",
+        "CREATE INDEX ix_timeline_entry_post_id ON timeline_entry (post_id)",
+    ])
+    fill = text(
+        "INSERT INTO timeline_entry (user_id, created_at, post_id, club_id) "
+        "SELECT club_follower.user_id, post.created_at, post.id, post.club_id FROM post "
+        "JOIN club_follower ON club_follower.club_id = post.club_id "
+        "JOIN club ON club.id = post.club_id "
+        "WHERE club.follower_count <= :fanout_limit AND post.created_at >= :since"
+    ).bindparams(bindparam('since', type_=DateTime))
+    with engine.begin() as connection:
+        connection.execute(text("DELETE FROM timeline_entry"))
+        connection.execute(fill, {'fanout_limit': timeline.FANOUT_LIMIT,
+                                  'since': timeline.horizon() - timeline.PRUNE_SLACK})
+
+def version_stamps(engine, batch_size=1000):
+    """Club.updated_at and Post.updated_at, for conditional GETs."""
+    add_column_if_missing(engine, 'club', 'updated_at', "TIMESTAMP")
+    add_column_if_missing(engine, 'post', 'updated_at', "TIMESTAMP")
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE club SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+        max_id = connection.scalar(text("SELECT MAX(id) FROM post")) or 0
+    for start in range(1, max_id + 1, batch_size):
+        with engine.begin() as connection:
+            connection.execute(text(
+                "UPDATE post SET updated_at = created_at WHERE updated_at IS NULL AND id BETWEEN :start AND :end"
+            ), {'start': start, 'end': start + batch_size - 1})
+    create_indexes(engine, [
+        "CREATE INDEX ix_post_club_id_updated_at ON post (club_id, updated_at)",
+    ])
+
+def directory_index(engine):
+    """Expression index on lower(club.name) for the club directory."""
+    create_indexes(engine, [
+        "CREATE INDEX ix_club_lower_name_id ON club (lower(name), id)",
+    ])
+
+def club_categories(engine):
+    """category and club_category tables, filled from Club.category."""
+    CATEGORY.create(engine, checkfirst=True)
+    CLUB_CATEGORY.create(engine, checkfirst=True)
+    create_indexes(engine, [
+        "CREATE INDEX ix_club_category_category_id_club_id ON club_category (category_id, club_id)",
+    ])
+    categories.rebuild_club_categories(engine)
+
+def club_slugs(engine):
+    """Club.slug with its unique index, and the club_redirect table for old URLs."""
+    add_column_if_missing(engine, 'club', 'slug', "VARCHAR(160)")
+    CLUB_REDIRECT.create(engine, checkfirst=True)
+    create_indexes(engine, [
+        "CREATE UNIQUE INDEX ix_club_slug ON club (slug)",
+        "CREATE INDEX ix_club_redirect_club_id ON club_redirect (club_id)",
+    ])
+    slugs.backfill_slugs(engine)
+
+def drop_club_search(engine):
+    """Drops the club full-text index, which no query used."""
+    with engine.begin() as connection:
+        # PostgreSQL drops ix_club_search_document along with the table
+        connection.execute(text("DROP TABLE IF EXISTS club_search"))
+
+def calendar_secrets(engine):
+    """User.calendar_secret, so calendar subscription links can be revoked."""
+    # Left NULL: ical.calendar_token() creates each secret on first use
+    add_column_if_missing(engine, 'user', 'calendar_secret', "VARCHAR(32)")
+
+MIGRATIONS = [
+    (1, 'initial schema', initial_schema),
+    (2, 'denormalized counter columns', counter_columns),
+    (3, 'indexes for hot queries', hot_query_indexes),
+    (4, 'full-text search index', full_text_search),
+    (5, 'background job queue', job_queue),
+    (6, 'fan-out following timelines', following_timelines),
+    (7, 'version stamps for conditional GETs', version_stamps),
+    (8, 'club directory index', directory_index),
+    (9, 'normalized club categories', club_categories),
+    (10, 'club slugs and redirects', club_slugs),
+    (11, 'drop unused club search index', drop_club_search),
+    (12, 'revocable calendar links', calendar_secrets),
+]
+
+# --- Runner ---
+
+def current_version(engine):
+    """Highest applied version, or 0 for a database that has never been migrated."""
+    with engine.connect() as connection:
+        if not db.inspect(connection).has_table('schema_version'):
+            return 0
+        return connection.scalar(db.select(db.func.max(schema_version.c.version))) or 0
+
+def pending(engine):
+    version = current_version(engine)
+    return [step for step in MIGRATIONS if step[0] > version]
+
+def upgrade(engine, log=print):
+    """Applies every pending step in order. Returns the list of versions applied."""
+    schema_version.create(engine, checkfirst=True)
+    applied = []
+    for version, description, step in pending(engine):
+        log(f"   + {version}: {description}")
+        step(engine)
+        with engine.begin() as connection:
+            connection.execute(schema_version.insert().values(
+                version=version, description=description, applied_at=datetime.now(timezone.utc)
+            ))
+        applied.append(version)
+    return applied
@@ -7,6 +7,8 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(150), unique=True, nullable=False)
     password_hash = db.Column(db.String(200), nullable=False)
     role = db.Column(db.String(20), nullable=False)
+    # Part of the iCal subscription token; a new value revokes old links (see ical.py)
+    calendar_secret = db.Column(db.String(32))
     rsvps = db.relationship('RSVP', backref='user', lazy=True)
     followed_clubs = db.relationship('ClubFollower', backref='follower', lazy=True)
     club = db.relationship('Club', backref='owner', uselist=False)
@@ -15,6 +17,8 @@ class User(UserMixin, db.Model):
 class Club(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(150), nullable=False, unique=True)
+    # URL name for /student/club/<slug>, assigned by slugs.py
+    slug = db.Column(db.String(160))
     category = db.Column(db.String(100))
     description = db.Column(db.Text)
     verified = db.Column(db.Boolean, default=False)
@@ -23,11 +27,43 @@ class Club(db.Model):
     # NEW FIELD FOR PROFILE PICTURE
     image_file = db.Column(db.String(120), nullable=False, default='default_club.jpg')
     
-    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    owner_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True, index=True)
     meeting_time = db.Column(db.String(100))
     location = db.Column(db.String(100))
     member_count = db.Column(db.Integer)
+    # Denormalized counter, maintained by counters.py
+    follower_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Version stamp for conditional GETs (see conditional.py); also touched when a post is added or removed
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
     posts = db.relationship('Post', backref='club', lazy=True)
+    # Normalized copy of `category`, maintained by categories.py
+    categories = db.relationship('Category', secondary='club_category', lazy=True, viewonly=True)
+
+    __table_args__ = (
+        # Club directory: ORDER BY lower(name), id (keyset paging) and name prefix search
+        db.Index('ix_club_lower_name_id', db.func.lower(name), 'id'),
+        # Club page lookups; an index rather than a constraint so migrations can add it
+        db.Index('ix_club_slug', 'slug', unique=True),
+    )
+
+class ClubRedirect(db.Model):
+    """A slug a club was known by before a rename; its page redirects to the current one."""
+    slug = db.Column(db.String(160), primary_key=True)
+    club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False, index=True)
+
+class Category(db.Model):
+    """One category name, shared by every club listed under it."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+
+club_category = db.Table(
+    'club_category',
+    db.Column('club_id', db.Integer, db.ForeignKey('club.id'), primary_key=True),
+    db.Column('category_id', db.Integer, db.ForeignKey('category.id'), primary_key=True),
+    # Category filters and facet counts: a category's clubs
+    db.Index('ix_club_category_category_id_club_id', 'category_id', 'club_id'),
+)
 
 # In models.py
 
@@ -41,25 +77,90 @@ class Post(db.Model):
     event_title = db.Column(db.String(100))
     event_date = db.Column(db.DateTime)
     event_location = db.Column(db.String(100))
+
+    # Denormalized counters, maintained by counters.py
+    like_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rsvp_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Version stamp for conditional GETs; onupdate also fires for the counter UPDATEs
+    updated_at = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc),
+                           onupdate=lambda: datetime.now(timezone.utc))
     
     # CRITICAL FIX: Added cascade="all, delete-orphan"
     rsvps = db.relationship('RSVP', backref='post', lazy=True, cascade="all, delete-orphan")
     likes = db.relationship('PostLike', backref='post', lazy=True, cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # Global feed: ORDER BY created_at DESC, id DESC (keyset pagination)
+        db.Index('ix_post_created_at_id', 'created_at', 'id'),
+        # Following feed and club pages: posts of given clubs, newest first
+        db.Index('ix_post_club_id_created_at', 'club_id', 'created_at'),
+        # club_detail: a club's upcoming events
+        db.Index('ix_post_club_id_is_event_event_date', 'club_id', 'is_event', 'event_date'),
+        # club_detail validators: MAX(updated_at) of a club's posts
+        db.Index('ix_post_club_id_updated_at', 'club_id', 'updated_at'),
+    )
+
 class RSVP(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False, index=True)
     __table_args__ = (db.UniqueConstraint('user_id', 'post_id'),)
 
 class ClubFollower(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
+    club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False, index=True)
     __table_args__ = (db.UniqueConstraint('user_id', 'club_id'),)
 
 class PostLike(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False)
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id'),)
\ No newline at end of file
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), nullable=False, index=True)
+    __table_args__ = (db.UniqueConstraint('user_id', 'post_id'),)
+
+class TimelineEntry(db.Model):
+    """A post in one follower's following feed, written when the post is created (see timeline.py)."""
+    # The primary key doubles as the feed index: one user's entries, newest first
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    created_at = db.Column(db.DateTime, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('post.id'), primary_key=True, index=True)
+    club_id = db.Column(db.Integer, db.ForeignKey('club.id'), nullable=False)
+    __table_args__ = (
+        # Pruning entries that fall behind the timeline horizon
+        db.Index('ix_timeline_entry_created_at', 'created_at'),
+    )
+
+# Background job queue; the queue logic is in jobs.py
+JOB_MAX_ATTEMPTS = 5
+
+def _naive_utcnow():
+    # Naive UTC, matching how DateTime columns round-trip on SQLite
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+class Job(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued | running
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=JOB_MAX_ATTEMPTS)
+    run_at = db.Column(db.DateTime, nullable=False, default=_naive_utcnow)
+    locked_by = db.Column(db.String(100))
+    locked_at = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False, default=_naive_utcnow)
+
+    __table_args__ = (
+        # Workers claim the oldest runnable job
+        db.Index('ix_job_status_run_at', 'status', 'run_at'),
+    )
+
+class DeadJob(db.Model):
+    """A job that failed max_attempts times; `flask jobs retry-dead` requeues it."""
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    payload = db.Column(db.JSON, nullable=False, default=dict)
+    attempts = db.Column(db.Integer, nullable=False)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, nullable=False)
+    failed_at = db.Column(db.DateTime, nullable=False, default=_naive_utcnow)
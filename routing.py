@@ -0,0 +1,72 @@
+# routing.py
+# Sends reads to the read replicas (DATABASE_REPLICA_URLS, see database.py)
+# and everything else to the primary. db.session uses RoutingSession, which
+# picks the engine per statement:
+#
+#   replica   SELECTs in a GET/HEAD request
+#   primary   writes, flushes, raw text() statements, CLI commands and jobs,
+#             cache builds (a cached value outlives replica lag), and every
+#             statement of a request once it has written
+#
+# Read-your-writes: a request that writes stamps the user's session cookie,
+# and for DB_STICKY_SECONDS afterwards that browser's reads stay on the
+# primary, so a like or RSVP never shows up as undone because a replica is
+# a moment behind. Each request sticks to one randomly chosen replica.
+import random
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session as cookie_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+STICKY_SECONDS = 5
+STICKY_KEY = '_primary_until'
+
+class RoutingSession(Session):
+    """Flask-SQLAlchemy session that reads from a replica when it is safe to."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and isinstance(clause, Select):
+            replica = self._replica()
+            if replica is not None:
+                return replica
+        elif has_request_context() and (self._flushing or isinstance(clause, UpdateBase)):
+            g.db_wrote = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _replica(self):
+        if not has_request_context() or request.method not in ('GET', 'HEAD'):
+            return None
+        if g.get('db_wrote') or g.get('db_primary') or cookie_session.get(STICKY_KEY, 0) > time.time():
+            return None
+        replicas = current_app.config.get('DATABASE_REPLICAS')
+        if not replicas:
+            return None
+        if 'db_replica' not in g:
+            g.db_replica = random.choice(replicas)
+        return self._db.engines[g.db_replica]
+
+@contextmanager
+def primary():
+    """Reads inside the block go to the primary."""
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('db_primary', False)
+    g.db_primary = True
+    try:
+        yield
+    finally:
+        g.db_primary = previous
+
+def _remember_write(response):
+    if not current_app.config.get('DATABASE_REPLICAS'):
+        return response  # every read is on the primary already; no need to touch the cookie
+    if g.get('db_wrote'):
+        cookie_session[STICKY_KEY] = time.time() + current_app.config.get('DB_STICKY_SECONDS', STICKY_SECONDS)
+    return response
+
+def init_app(app):
+    """Keeps a browser's reads on the primary for a short window after it writes."""
+    app.after_request(_remember_write)
@@ -0,0 +1,124 @@
+# search.py
+# Full-text search over posts (title, caption and club name).
+# SQLite uses an FTS5 virtual table keyed by rowid; PostgreSQL uses a tsvector
+# table with a GIN index. Both are kept in sync by mapper events on Post, so
+# every insert/update/delete is indexed in the same transaction; renaming a
+# club re-indexes its posts, which hold a copy of the name. Clubs have no
+# index of their own: the directory finds them by name prefix on
+# ix_club_lower_name_id (see directory.py).
+import re
+from sqlalchemy import event, inspect, select, text
+from extensions import db
+from models import Club, Post
+
+SEARCH_LIMIT = 50
+
+SQLITE_SCHEMA = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS post_search USING fts5("
+    "title, body, club_name, tokenize='unicode61', prefix='2 3')",
+]
+
+POSTGRES_SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS post_search (post_id INTEGER PRIMARY KEY, document TSVECTOR NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS ix_post_search_document ON post_search USING GIN (document)",
+]
+
+# --- Index Maintenance ---
+
+def init_search_index(connection):
+    """Creates the search tables for the connected database if they are missing."""
+    schema = POSTGRES_SCHEMA if connection.dialect.name == 'postgresql' else SQLITE_SCHEMA
+    for statement in schema:
+        connection.execute(text(statement))
+
+def rebuild_search_index(connection):
+    """Creates the search tables if needed and re-indexes every post."""
+    init_search_index(connection)
+    connection.execute(text("DELETE FROM post_search"))
+    index_posts(connection, connection.execute(text("SELECT id FROM post")).scalars().all())
+
+def index_post(connection, post_id):
+    """Writes (or rewrites) the search entry for one post."""
+    index_posts(connection, [post_id])
+
+def index_posts(connection, post_ids):
+    """Writes (or rewrites) the search entries for many posts, one executemany per statement."""
+    if not post_ids:
+        return
+    params = [{'id': post_id} for post_id in post_ids]
+    remove_posts(connection, post_ids)
+    if connection.dialect.name == 'postgresql':
+        connection.execute(text(
+            "INSERT INTO post_search (post_id, document) "
+            "SELECT post.id, "
+            "setweight(to_tsvector('simple', coalesce(post.event_title, '')), 'A') || "
+            "setweight(to_tsvector('simple', coalesce(club.name, '')), 'B') || "
+            "setweight(to_tsvector('simple', coalesce(post.caption, '')), 'C') "
+            "FROM post JOIN club ON club.id = post.club_id WHERE post.id = :id"
+        ), params)
+    else:
+        connection.execute(text(
+            "INSERT INTO post_search (rowid, title, body, club_name) "
+            "SELECT post.id, coalesce(post.event_title, ''), coalesce(post.caption, ''), club.name "
+            "FROM post JOIN club ON club.id = post.club_id WHERE post.id = :id"
+        ), params)
+
+def remove_post(connection, post_id):
+    remove_posts(connection, [post_id])
+
+def remove_posts(connection, post_ids):
+    key = 'post_id' if connection.dialect.name == 'postgresql' else 'rowid'
+    connection.execute(text(f"DELETE FROM post_search WHERE {key} = :id"), [{'id': i} for i in post_ids])
+
+# Keep the index in step with the ORM, inside the same transaction as the write
+@event.listens_for(Post, 'after_insert')
+@event.listens_for(Post, 'after_update')
+def _sync_post(mapper, connection, post):
+    index_post(connection, post.id)
+
+@event.listens_for(Post, 'after_delete')
+def _remove_post(mapper, connection, post):
+    remove_post(connection, post.id)
+
+@event.listens_for(Club, 'after_update')
+def _sync_club_posts(mapper, connection, club):
+    if inspect(club).attrs.name.history.has_changes():
+        index_posts(connection, connection.scalars(select(Post.id).where(Post.club_id == club.id)).all())
+
+# --- Queries ---
+
+def search_terms(query):
+    """Splits user input into word tokens; punctuation never reaches the MATCH syntax."""
+    return re.findall(r'\w+', query or '')
+
+def search_post_ids(query, limit=SEARCH_LIMIT, verified_only=False):
+    """Returns IDs of posts matching every word of `query` as a prefix, best match first.
+
+    With verified_only, posts of unverified clubs are left out before the
+    LIMIT, so they never take places among the top `limit`.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return []
+
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # simple:* gives prefix matching on every term, & requires all of them
+        ts_query = ' & '.join(f"{term}:*" for term in terms)
+        verified = ("JOIN post ON post.id = post_search.post_id JOIN club ON club.id = post.club_id "
+                    "AND club.verified = true ") if verified_only else ""
+        rows = db.session.execute(text(
+            f"SELECT post_search.post_id FROM post_search {verified}"
+            f"CROSS JOIN to_tsquery('simple', :q) AS q "
+            f"WHERE document @@ q ORDER BY ts_rank(document, q) DESC LIMIT :limit"
+        ), {'q': ts_query, 'limit': limit})
+    else:
+        # Quoted tokens with a trailing * are prefix queries; bm25 weights favour titles
+        match = ' '.join(f'"{term}"*' for term in terms)
+        verified = ("JOIN post ON post.id = post_search.rowid JOIN club ON club.id = post.club_id "
+                    "AND club.verified = 1 ") if verified_only else ""
+        rows = db.session.execute(text(
+            f"SELECT post_search.rowid FROM post_search {verified}"
+            f"WHERE post_search MATCH :q "
+            f"ORDER BY bm25(post_search, 10.0, 1.0, 5.0) LIMIT :limit"
+        ), {'q': match, 'limit': limit})
+    return [row[0] for row in rows]
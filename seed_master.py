@@ -1,6 +1,8 @@
-import pandas as pd
 import os
 from app import app, db
+import migrations
+from bulk_import import import_clubs, read_records
+from categories import normalize_categories
 from models import Club, Post, User, PostLike
 from datetime import datetime, timedelta, timezone
 import random
@@ -62,7 +64,8 @@ def seed_everything():
     with app.app_context():
         print("1. Resetting Database...")
         db.drop_all()
-        db.create_all()
+        # drop_all also drops schema_version, so this rebuilds the schema from step 1
+        migrations.upgrade(db.engine)
 
         # --- STEP 1: CREATE DUMMY USERS (For random likes) ---
         print("2. Creating Dummy Users...")
@@ -86,29 +89,9 @@ def seed_everything():
         print(f"3. Loading Clubs from {csv_path}...")
         try:
             if os.path.exists(csv_path):
-                df = pd.read_csv(csv_path).fillna('')
-                for index, row in df.iterrows():
-                    # Only add if it doesn't exist
-                    if not Club.query.filter_by(name=row['name']).first():
-                        # Parse member count safely
-                        count_val = 0
-                        raw_count = str(row['member_count'])
-                        if raw_count.replace('.','',1).isdigit(): 
-                            count_val = int(float(raw_count))
-
-                        new_club = Club(
-                            name=row['name'],
-                            category=row['category'],
-                            meeting_time=row['meeting_time'],
-                            location=row['location'],
-                            member_count=count_val,
-                            description=row['description'],
-                            verified=True, # Auto-verify CSV clubs so they appear
-                            officer_verified=False 
-                        )
-                        db.session.add(new_club)
-                db.session.commit()
-                print("   - CSV Clubs loaded.")
+                # Streams the CSV in batches; CSV clubs are auto-verified so they appear
+                stats = import_clubs(db.engine, read_records(csv_path), verified=True)
+                print(f"   - CSV Clubs loaded ({stats}).")
             else:
                 print("   ! CSV not found. Skipping CSV load.")
         except Exception as e:
@@ -116,7 +99,8 @@ def seed_everything():
 
         # --- STEP 3: SEED DEMO POSTS ---
         print("4. Seeding Demo Posts...")
-        
+        users = User.query.filter(User.role == 'student').all()
+
         for p in DEMO_POSTS:
             # 1. Find the club (fuzzy match to be safe)
             club = Club.query.filter(Club.name.ilike(f"%{p['club']}%")).first()
@@ -126,14 +110,14 @@ def seed_everything():
                 print(f"   + Creating missing club: {p['club']}")
                 club = Club(
                     name=p['club'],
-                    category="General",
+                    category=normalize_categories("General"),
                     description=f"Official page for {p['club']}.",
                     verified=True,
                     officer_verified=True, 
                     member_count=10
                 )
                 db.session.add(club)
-                db.session.commit() 
+                db.session.flush()
 
             # 2. Calculate Post Time
             post_time = datetime.now(timezone.utc)
@@ -157,21 +141,20 @@ def seed_everything():
                 new_post.event_date = datetime.now(timezone.utc) + timedelta(days=p['offset'])
 
             db.session.add(new_post)
-            db.session.commit() # Commit to generate ID
+            db.session.flush() # Flush to generate ID
 
             # 4. Add Fake Likes
-            # Reload users to attach to session
-            users = User.query.filter(User.role == 'student').all()
             if users:
                 num_likes = min(p.get('likes', 0), len(users))
                 selected_users = random.sample(users, num_likes)
                 for u in selected_users:
                     like = PostLike(user_id=u.id, post_id=new_post.id)
                     db.session.add(like)
-                db.session.commit()
+                new_post.like_count = num_likes
 
             print(f"   + Post added for {club.name}")
 
+        db.session.commit()
         print("Done! Database is fully seeded with demo content.")
 
 if __name__ == "__main__":
@@ -0,0 +1,115 @@
+# slugs.py
+# Club URL slugs: /student/club/chess-club.
+# Every club has a unique slug in Club.slug (ix_club_slug), so loading a club
+# page is one index probe. A slug is the name as lowercase ASCII words joined
+# by hyphens, with -2, -3, ... added when another club already has it. Slugs
+# are assigned when a club is created or renamed (mapper events below) and
+# when it is imported (bulk_import calls unique_slugs() itself).
+#
+# The slug a club had before a rename stays in club_redirect, so old links
+# answer with a redirect to the current page:
+#
+#   redirect_target('chess-club')   # 'chess-and-go-club', or None
+#
+# A slug held by a redirect is never handed to a different club.
+import re
+import unicodedata
+from sqlalchemy import and_, delete, event, inspect, insert, select, text, union_all
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Club, ClubRedirect
+
+MAX_SLUG = 150  # leaves room in the column for a -N suffix
+
+def slugify(name):
+    """'Café Society (UCM)' -> 'cafe-society-ucm'."""
+    ascii_name = unicodedata.normalize('NFKD', name or '').encode('ascii', 'ignore').decode()
+    slug = re.sub(r'[^a-z0-9]+', '-', ascii_name.lower()).strip('-')[:MAX_SLUG].rstrip('-')
+    return slug or 'club'
+
+def legacy_slug(name):
+    """The old Name_With_Underscores URL form, kept as a redirect for existing links."""
+    return name.replace(' ', '_')
+
+def _used(connection, condition, club_id=None):
+    """Slugs matching `condition` held by other clubs or by their redirects."""
+    clubs = select(Club.slug).where(condition(Club.slug))
+    redirects = select(ClubRedirect.slug).where(condition(ClubRedirect.slug))
+    if club_id is not None:
+        clubs = clubs.where(Club.id != club_id)
+        redirects = redirects.where(ClubRedirect.club_id != club_id)
+    return set(connection.scalars(union_all(clubs, redirects)))
+
+def unique_slugs(connection, names, club_id=None):
+    """{name: slug} with a slug for each of `names` that no other club uses.
+
+    Pass `club_id` when slugging an existing club, so its own current and old
+    slugs count as free.
+    """
+    bases = {name: slugify(name) for name in names}
+    taken = _used(connection, lambda column: column.in_(set(bases.values())), club_id) if bases else set()
+    slugs = {}
+    for name, base in bases.items():
+        slug = base
+        if slug in taken:
+            # '.' sorts right after '-', so this is a range scan over base-*
+            taken |= _used(connection, lambda column: and_(column > base + '-', column < base + '.'), club_id)
+            suffix = 2
+            while f'{base}-{suffix}' in taken:
+                suffix += 1
+            slug = f'{base}-{suffix}'
+        taken.add(slug)
+        slugs[name] = slug
+    return slugs
+
+def _insert(connection, table):
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    return dialect.insert(table)
+
+def backfill_slugs(engine, batch_size=1000):
+    """Slugs every club that has none, and keeps each one's legacy URL as a redirect."""
+    # Plain SQL: an UPDATE built from Club would also apply model onupdates to columns
+    # a migration may not have added yet
+    set_slug = text("UPDATE club SET slug = :new_slug WHERE id = :club_id")
+    while True:
+        with engine.begin() as connection:
+            rows = connection.execute(select(Club.id, Club.name).where(Club.slug.is_(None))
+                                      .order_by(Club.id).limit(batch_size)).all()
+            if not rows:
+                return
+            slugs = unique_slugs(connection, [row.name for row in rows])
+            connection.execute(set_slug, [{'club_id': row.id, 'new_slug': slugs[row.name]} for row in rows])
+            legacy = [{'slug': legacy_slug(row.name), 'club_id': row.id} for row in rows
+                      if legacy_slug(row.name) != slugs[row.name]]
+            if legacy:
+                statement = _insert(connection, ClubRedirect.__table__).on_conflict_do_nothing(index_elements=['slug'])
+                connection.execute(statement, legacy)
+
+def redirect_target(slug):
+    """The current slug of the club that was at `slug` before a rename, or None."""
+    return db.session.scalar(select(Club.slug).join(ClubRedirect, ClubRedirect.club_id == Club.id)
+                             .where(ClubRedirect.slug == slug))
+
+# Assign slugs on ORM writes, inside the same transaction
+@event.listens_for(Club, 'before_insert')
+def _slug_new_club(mapper, connection, club):
+    if not club.slug:
+        club.slug = unique_slugs(connection, [club.name])[club.name]
+
+@event.listens_for(Club, 'before_update')
+def _slug_renamed_club(mapper, connection, club):
+    # Renamed, or a club from before slugs existed being claimed or edited
+    if club.slug and not inspect(club).attrs.name.history.has_changes():
+        return
+    slug = unique_slugs(connection, [club.name], club.id)[club.name]
+    if slug == club.slug:
+        return
+    if club.slug:
+        connection.execute(insert(ClubRedirect).values(slug=club.slug, club_id=club.id))
+    # Renamed back: the club takes its old slug over from its own redirect
+    connection.execute(delete(ClubRedirect).where(ClubRedirect.slug == slug))
+    club.slug = slug
+
+@event.listens_for(Club, 'before_delete')
+def _remove_redirects(mapper, connection, club):
+    connection.execute(delete(ClubRedirect).where(ClubRedirect.club_id == club.id))
@@ -0,0 +1,154 @@
+# synthetic.py
+# Builds realistic, campus-sized datasets for load testing (`flask generate-data`).
+# Popularity is skewed the way real campuses are: a few clubs hold most of the
+# followers and posts, a few posts get most of the likes, and a minority of
+# students do most of the liking. Draws follow a Zipf-like law, P(rank k) ~ 1/k^s.
+#
+# Rows are produced as generators and streamed through bulk_import, so even the
+# "campus" scale (millions of likes) never holds a whole table in memory.
+import random
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from extensions import db, bcrypt
+from models import Club, Post, User, PostLike, RSVP, ClubFollower
+import bulk_import
+import counters
+import timeline
+
+SCALES = {
+    'small': {'students': 2_000, 'clubs': 100, 'posts': 10_000,
+              'likes': 50_000, 'rsvps': 10_000, 'follows': 10_000},
+    'medium': {'students': 10_000, 'clubs': 300, 'posts': 100_000,
+               'likes': 500_000, 'rsvps': 100_000, 'follows': 50_000},
+    'campus': {'students': 50_000, 'clubs': 1_000, 'posts': 500_000,
+               'likes': 3_000_000, 'rsvps': 500_000, 'follows': 250_000},
+}
+
+# Zipf exponents: higher means more concentrated on the top ranks
+CLUB_SKEW = 1.0      # followers and posts per club
+POST_SKEW = 0.9      # likes and RSVPs per post
+STUDENT_SKEW = 0.6   # how active each student is
+
+CATEGORIES = ['Academic', 'Cultural', 'Sports', 'Arts', 'Service', 'Professional',
+              'Religious', 'Social', 'Wellness', 'Technology', 'Gaming', 'Outdoors']
+WORDS = ('meeting workshop social night tournament study session guest speaker '
+         'volunteer trip potluck practice showcase hackathon mixer panel career '
+         'fair welcome back general elections fundraiser movie game').split()
+PLACES = ['COB1 105', 'COB2 140', 'SE1 100', 'KL 232', 'Lantern', 'Rec Field', 'Gym', 'Library Lawn']
+
+DEFAULT_PASSWORD = 'password'  # every generated account logs in with this
+
+class SkewedPicker:
+    """Draws indexes 0..n-1 with P(i) proportional to 1/(rank(i)+1)^skew.
+
+    Ranks are shuffled, so popularity is not correlated with id order.
+    """
+
+    def __init__(self, n, skew, rng):
+        self.rng = rng
+        self.order = list(range(n))
+        rng.shuffle(self.order)
+        self.cum_weights = list(accumulate(1 / (rank + 1) ** skew for rank in range(n)))
+
+    def pick(self, k):
+        ranks = self.rng.choices(range(len(self.order)), cum_weights=self.cum_weights, k=k)
+        return [self.order[rank] for rank in ranks]
+
+def _chunked_picks(picker, total, chunk=100_000):
+    while total > 0:
+        yield from picker.pick(min(chunk, total))
+        total -= chunk
+
+# --- Record Generators ---
+
+def user_records(scale, password_hash):
+    yield {'email': 'admin@ucmerced.edu', 'role': 'admin', 'password_hash': password_hash}
+    for i in range(scale['clubs']):
+        yield {'email': f'officer{i}@ucmerced.edu', 'role': 'club', 'password_hash': password_hash}
+    for i in range(scale['students']):
+        yield {'email': f'student{i}@ucmerced.edu', 'role': 'student', 'password_hash': password_hash}
+
+def club_records(scale, officer_ids, rng):
+    for i in range(scale['clubs']):
+        category = rng.choice(CATEGORIES)
+        yield {
+            'name': f'{category} Club {i}',
+            'category': category,
+            'description': f'A {category.lower()} club for students interested in {" ".join(rng.sample(WORDS, 3))}.',
+            'meeting_time': f'{rng.choice(["Mon", "Tue", "Wed", "Thu", "Fri"])} {rng.randint(4, 8)}pm',
+            'location': rng.choice(PLACES),
+            'member_count': rng.randint(5, 400),
+            # Leave some clubs unverified so the admin approval queue is not empty
+            'verified': rng.random() < 0.9,
+            'officer_verified': rng.random() < 0.8,
+            'owner_id': officer_ids[i] if i < len(officer_ids) else None,
+        }
+
+def post_records(scale, club_names, clubs, rng, now):
+    for club_index in _chunked_picks(clubs, scale['posts']):
+        created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+        is_event = rng.random() < 0.3
+        words = ' '.join(rng.sample(WORDS, 4))
+        yield {
+            'club': club_names[club_index],
+            'caption': f'Join us for our {words}!' if is_event else f'Thanks for coming to the {words}.',
+            'created_at': created_at,
+            'is_event': is_event,
+            'event_title': words.title() if is_event else None,
+            'event_date': created_at + timedelta(days=rng.randint(1, 60)) if is_event else None,
+            'event_location': rng.choice(PLACES) if is_event else None,
+        }
+
+def link_records(total, user_ids, users, target_ids, targets, target_key):
+    """(user, target) pairs drawn from two SkewedPickers; duplicates are dropped on insert."""
+    for user_index, target_index in zip(_chunked_picks(users, total), _chunked_picks(targets, total)):
+        yield {'user_id': user_ids[user_index], target_key: target_ids[target_index]}
+
+# --- Generation ---
+
+def generate(engine, scale, seed=0, log=print):
+    """Fills an empty, migrated database with a synthetic dataset. Returns the ImportStats list."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    results = []
+
+    def load(stats):
+        log(f"   {stats}")
+        results.append(stats)
+
+    def ids(query):
+        with engine.connect() as connection:
+            return connection.scalars(query).all()
+
+    # One bcrypt hash shared by every row: hashing per user would dominate the run
+    password_hash = bcrypt.generate_password_hash(DEFAULT_PASSWORD).decode('utf-8')
+    load(bulk_import.import_users(engine, user_records(scale, password_hash)))
+    officer_ids = ids(db.select(User.id).where(User.role == 'club').order_by(User.id))
+    student_ids = ids(db.select(User.id).where(User.role == 'student'))
+
+    load(bulk_import.import_clubs(engine, club_records(scale, officer_ids, rng)))
+    with engine.connect() as connection:
+        club_rows = connection.execute(db.select(Club.id, Club.name)).all()
+    club_ids = [row.id for row in club_rows]
+    club_names = [row.name for row in club_rows]
+    # The clubs that post the most are also the most followed
+    clubs = SkewedPicker(len(club_ids), CLUB_SKEW, rng)
+    students = SkewedPicker(len(student_ids), STUDENT_SKEW, rng)
+
+    load(bulk_import.import_posts(engine, post_records(scale, club_names, clubs, rng, now)))
+    post_ids = ids(db.select(Post.id))
+    event_ids = ids(db.select(Post.id).where(Post.is_event == True))
+
+    load(bulk_import.import_links(engine, ClubFollower, link_records(
+        scale['follows'], student_ids, students, club_ids, clubs, 'club_id')))
+    load(bulk_import.import_links(engine, PostLike, link_records(
+        scale['likes'], student_ids, students, post_ids, SkewedPicker(len(post_ids), POST_SKEW, rng), 'post_id')))
+    if event_ids:
+        load(bulk_import.import_links(engine, RSVP, link_records(
+            scale['rsvps'], student_ids, students, event_ids, SkewedPicker(len(event_ids), POST_SKEW, rng), 'post_id')))
+
+    log("   backfilling counters and timelines...")
+    counters.backfill(engine)
+    with engine.begin() as connection:
+        timeline.rebuild_timelines(connection)
+    return results
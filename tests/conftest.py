@@ -0,0 +1,16 @@
+import pytest
+from flask import Flask
+import database
+import migrations
+from extensions import db
+
+@pytest.fixture
+def app(tmp_path):
+    """A Flask app on a migrated scratch SQLite database, with its app context pushed."""
+    app = Flask(__name__)
+    app.config.update(database.engine_config(f"sqlite:///{tmp_path / 'bobcat.db'}"))
+    db.init_app(app)
+    with app.app_context():
+        migrations.upgrade(db.engine, log=lambda message: None)
+        yield app
+        db.session.remove()
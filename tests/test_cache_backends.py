@@ -0,0 +1,23 @@
+# The cache backends CACHE_URL can pick, checked with check_backend().
+import pytest
+from flask import Flask
+from flask_caching import Cache
+from cache_backends import cache_config, check_backend
+
+def checked(config):
+    app = Flask(__name__)
+    cache = Cache(app, config=config)
+    with app.app_context():
+        return check_backend(cache)
+
+def test_filesystem_cache(tmp_path):
+    assert checked(cache_config(f'file://{tmp_path}')) == []
+
+def test_redis_cache():
+    pytest.importorskip('redis')
+    from fake_redis import FakeRedisServer
+    server = FakeRedisServer().start()
+    try:
+        assert checked(cache_config(server.url)) == []
+    finally:
+        server.stop()
@@ -0,0 +1,13 @@
+# The RSVP calendar's date range parsing.
+from datetime import datetime
+from blueprints.student import parse_calendar_bound
+
+def test_utc_bound():
+    assert parse_calendar_bound('2026-10-16T07:00:00Z') == datetime(2026, 10, 16, 7)
+
+def test_offset_bound_converts_to_utc():
+    assert parse_calendar_bound('2026-10-16T00:00:00-07:00') == datetime(2026, 10, 16, 7)
+
+def test_naive_bound_is_kept():
+    assert parse_calendar_bound('2026-10-16T00:00:00') == datetime(2026, 10, 16)
+    assert parse_calendar_bound(None) is None
@@ -0,0 +1,13 @@
+# SQLite engine settings under concurrent readers and writers.
+from database import SQLITE_PRAGMAS, stress
+
+def test_tuned_pragmas_under_concurrency(tmp_path):
+    (tmp_path / 'tuned').mkdir()
+    (tmp_path / 'defaults').mkdir()
+    options = {'threads': 4, 'seconds': 1.0, 'write_ratio': 0.2, 'rows': 2000}
+
+    tuned = stress(SQLITE_PRAGMAS, directory=str(tmp_path / 'tuned'), **options)
+    defaults = stress(None, directory=str(tmp_path / 'defaults'), **options)
+
+    assert tuned['locked'] == 0
+    assert tuned['ops_per_second'] >= defaults['ops_per_second']
@@ -0,0 +1,96 @@
+# Upgrading old databases with migrations.upgrade().
+# Run from the repository root with `python -m pytest`.
+from sqlalchemy import create_engine, text
+import migrations
+from extensions import db
+
+# The schema db.create_all() made before migrations existed
+BASELINE_SCHEMA = [
+    """CREATE TABLE user (
+        id INTEGER NOT NULL, email VARCHAR(150) NOT NULL, password_hash VARCHAR(200) NOT NULL,
+        role VARCHAR(20) NOT NULL, PRIMARY KEY (id), UNIQUE (email))""",
+    """CREATE TABLE club (
+        id INTEGER NOT NULL, name VARCHAR(150) NOT NULL, category VARCHAR(100), description TEXT,
+        verified BOOLEAN, officer_verified BOOLEAN, image_file VARCHAR(120) NOT NULL, owner_id INTEGER,
+        meeting_time VARCHAR(100), location VARCHAR(100), member_count INTEGER,
+        PRIMARY KEY (id), UNIQUE (name), FOREIGN KEY(owner_id) REFERENCES user (id))""",
+    """CREATE TABLE post (
+        id INTEGER NOT NULL, club_id INTEGER NOT NULL, image_file VARCHAR(120) NOT NULL, caption TEXT,
+        created_at DATETIME, is_event BOOLEAN, event_title VARCHAR(100), event_date DATETIME,
+        event_location VARCHAR(100), PRIMARY KEY (id), FOREIGN KEY(club_id) REFERENCES club (id))""",
+    """CREATE TABLE club_follower (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, club_id INTEGER NOT NULL, PRIMARY KEY (id),
+        UNIQUE (user_id, club_id), FOREIGN KEY(user_id) REFERENCES user (id),
+        FOREIGN KEY(club_id) REFERENCES club (id))""",
+    """CREATE TABLE rsvp (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, post_id INTEGER NOT NULL, PRIMARY KEY (id),
+        UNIQUE (user_id, post_id), FOREIGN KEY(user_id) REFERENCES user (id),
+        FOREIGN KEY(post_id) REFERENCES post (id))""",
+    """CREATE TABLE post_like (
+        id INTEGER NOT NULL, user_id INTEGER NOT NULL, post_id INTEGER NOT NULL, PRIMARY KEY (id),
+        UNIQUE (user_id, post_id), FOREIGN KEY(user_id) REFERENCES user (id),
+        FOREIGN KEY(post_id) REFERENCES post (id))""",
+]
+
+BASELINE_ROWS = [
+    "INSERT INTO user (id, email, password_hash, role) VALUES "
+    "(1, 'chess@ucmerced.edu', 'x', 'club'), (2, 'student@ucmerced.edu', 'x', 'student')",
+    "INSERT INTO club (id, name, category, verified, image_file, owner_id) VALUES "
+    "(1, 'Chess Club', 'Games, Social', 1, 'default_club.jpg', 1)",
+    "INSERT INTO post (id, club_id, image_file, caption, created_at, is_event) VALUES "
+    "(1, 1, 'default.jpg', 'Weekly meeting', CURRENT_TIMESTAMP, 0)",
+    "INSERT INTO club_follower (id, user_id, club_id) VALUES (1, 2, 1)",
+    "INSERT INTO post_like (id, user_id, post_id) VALUES (1, 2, 1)",
+    "INSERT INTO rsvp (id, user_id, post_id) VALUES (1, 2, 1)",
+]
+
+def baseline_engine(path):
+    engine = create_engine(f'sqlite:///{path}')
+    with engine.begin() as connection:
+        for statement in BASELINE_SCHEMA + BASELINE_ROWS:
+            connection.execute(text(statement))
+    return engine
+
+def schema(engine):
+    """{table: (column names, index names)}, leaving out SQLite's own tables and the search tables."""
+    with engine.connect() as connection:
+        tables = connection.scalars(text(
+            "SELECT name FROM sqlite_master WHERE type = 'table' "
+            "AND name NOT LIKE 'sqlite_%' AND name NOT LIKE '%_search%'"
+        )).all()
+        return {table: (
+            {row[1] for row in connection.exec_driver_sql(f'PRAGMA table_info("{table}")')},
+            {row[1] for row in connection.exec_driver_sql(f'PRAGMA index_list("{table}")')
+             if not row[1].startswith('sqlite_autoindex')},
+        ) for table in tables}
+
+def test_upgrade_baseline_database(tmp_path):
+    engine = baseline_engine(tmp_path / 'baseline.db')
+
+    applied = migrations.upgrade(engine, log=lambda message: None)
+
+    assert applied == [version for version, _, _ in migrations.MIGRATIONS]
+    assert migrations.current_version(engine) == migrations.MIGRATIONS[-1][0]
+    with engine.connect() as connection:
+        assert connection.execute(text("SELECT like_count, rsvp_count FROM post")).one() == (1, 1)
+        club = connection.execute(text("SELECT follower_count, slug, updated_at FROM club")).one()
+        assert club.follower_count == 1 and club.slug == 'chess-club' and club.updated_at is not None
+        assert connection.scalar(text("SELECT COUNT(*) FROM club_category")) == 2
+        assert connection.scalar(text("SELECT COUNT(*) FROM timeline_entry WHERE user_id = 2")) == 1
+
+def test_upgraded_schema_matches_models(tmp_path):
+    upgraded = baseline_engine(tmp_path / 'baseline.db')
+    fresh = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    declared = create_engine(f"sqlite:///{tmp_path / 'models.db'}")
+    migrations.upgrade(upgraded, log=lambda message: None)
+    migrations.upgrade(fresh, log=lambda message: None)
+    db.metadata.create_all(declared)
+
+    assert schema(upgraded) == schema(declared)
+    assert schema(fresh) == schema(declared)
+
+def test_upgrade_is_a_no_op_when_current(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    migrations.upgrade(engine, log=lambda message: None)
+
+    assert migrations.upgrade(engine, log=lambda message: None) == []
@@ -0,0 +1,7 @@
+# The hot queries must keep using indexes (see indexes.py).
+from extensions import db
+from indexes import check_query_plans
+
+def test_hot_queries_use_indexes(app):
+    with db.engine.begin() as connection:
+        assert check_query_plans(connection) == {}
@@ -0,0 +1,19 @@
+# Read-your-writes stickiness for replica reads.
+from flask import g, session
+from routing import STICKY_KEY, _remember_write
+
+def remember_write(app):
+    app.config['SECRET_KEY'] = 'test'
+    with app.test_request_context('/', method='POST'):
+        g.db_wrote = True
+        _remember_write(app.response_class())
+        return session.modified, session.get(STICKY_KEY)
+
+def test_write_sticks_to_primary_with_replicas(app):
+    app.config['DATABASE_REPLICAS'] = ['replica_0']
+    modified, until = remember_write(app)
+    assert modified and until is not None
+
+def test_write_leaves_session_alone_without_replicas(app):
+    app.config['DATABASE_REPLICAS'] = []
+    assert remember_write(app) == (False, None)
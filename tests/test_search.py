@@ -0,0 +1,19 @@
+# Full-text post search and keeping it in step with club data.
+from extensions import db
+from models import Club, Post
+from search import search_post_ids
+
+def test_renaming_a_club_reindexes_its_posts(app):
+    club = Club(name='Chess Club', verified=True)
+    db.session.add(club)
+    db.session.flush()
+    post = Post(club_id=club.id, caption='Weekly meeting')
+    db.session.add(post)
+    db.session.commit()
+    assert search_post_ids('chess') == [post.id]
+
+    club.name = 'Strategy Games Society'
+    db.session.commit()
+
+    assert search_post_ids('chess') == []
+    assert search_post_ids('strategy') == [post.id]
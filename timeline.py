@@ -0,0 +1,133 @@
+# timeline.py
+# Fan-out-on-write following feed.
+# When a club posts, one INSERT ... SELECT copies the post into the timeline of
+# every follower, so reading the following feed is a range scan over one
+# user's timeline_entry rows instead of an IN (...) over every followed club.
+#
+#   - Large clubs (more than FANOUT_LIMIT followers) are not fanned out; their
+#     posts are read at request time and merged in (the hybrid read path).
+#   - Timelines only cover the last TIMELINE_DAYS. Scrolling past that horizon
+#     falls back to the old per-club query, so old posts never need copying.
+#   - Following a club backfills its recent posts, unfollowing removes them,
+#     and deleting a post removes its entries. Mapper events do this in the
+#     same transaction as the change, like the search index in search.py.
+#   - The hourly "repair_timelines" job prunes entries behind the horizon and
+#     fills gaps, e.g. for clubs that dropped back under FANOUT_LIMIT.
+#     Bulk imports bypass the mapper events, so they call rebuild_timelines().
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import and_, delete, event, select
+from sqlalchemy.dialects import postgresql, sqlite
+from extensions import db
+from models import Club, ClubFollower, Post, TimelineEntry
+from feed import FEED_PAGE_SIZE, after_cursor, decode_cursor, feed_query, split_page
+from caching import get_or_build
+
+FANOUT_LIMIT = 2000     # followers above which a club's posts are read, not copied
+TIMELINE_DAYS = 30
+PRUNE_SLACK = timedelta(days=1)  # keep a day past the horizon so reads never see a gap
+LARGE_CLUBS_TTL = 60    # seconds to cache the set of large clubs
+
+timeline = TimelineEntry.__table__
+
+def horizon():
+    """Oldest created_at the timelines are guaranteed to hold."""
+    return datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=TIMELINE_DAYS)
+
+def large_club_ids():
+    """Clubs whose posts are merged in at read time instead of fanned out."""
+    def build():
+        ids = db.session.scalars(select(Club.id).where(Club.follower_count > FANOUT_LIMIT)).all()
+        return set(ids), []
+    return get_or_build('timeline:large_clubs', [], build, timeout=LARGE_CLUBS_TTL)
+
+def _entries_select(*conditions):
+    """SELECT (user_id, created_at, post_id, club_id) for followers of posts matching conditions."""
+    return select(ClubFollower.user_id, Post.created_at, Post.id, Post.club_id) \
+        .join(ClubFollower, ClubFollower.club_id == Post.club_id) \
+        .join(Club, Club.id == Post.club_id) \
+        .where(Club.follower_count <= FANOUT_LIMIT, Post.created_at >= horizon() - PRUNE_SLACK, *conditions)
+
+def _insert_entries(connection, select_statement):
+    dialect = postgresql if connection.dialect.name == 'postgresql' else sqlite
+    statement = dialect.insert(timeline).from_select(
+        ['user_id', 'created_at', 'post_id', 'club_id'], select_statement
+    ).on_conflict_do_nothing()
+    return connection.execute(statement).rowcount
+
+# --- Write Path ---
+
+def fan_out(connection, post_id):
+    """Copies a new post into the timeline of every follower of its club."""
+    _insert_entries(connection, _entries_select(Post.id == post_id))
+
+def backfill_follow(connection, user_id, club_id):
+    """Adds a newly followed club's recent posts to the follower's timeline."""
+    _insert_entries(connection, _entries_select(Post.club_id == club_id, ClubFollower.user_id == user_id))
+
+def remove_follow(connection, user_id, club_id):
+    connection.execute(delete(timeline).where(timeline.c.user_id == user_id, timeline.c.club_id == club_id))
+
+def remove_post(connection, post_id):
+    connection.execute(delete(timeline).where(timeline.c.post_id == post_id))
+
+@event.listens_for(Post, 'after_insert')
+def _fan_out_post(mapper, connection, post):
+    fan_out(connection, post.id)
+
+@event.listens_for(Post, 'after_delete')
+def _remove_post(mapper, connection, post):
+    remove_post(connection, post.id)
+
+@event.listens_for(ClubFollower, 'after_insert')
+def _backfill_follow(mapper, connection, follow):
+    backfill_follow(connection, follow.user_id, follow.club_id)
+
+@event.listens_for(ClubFollower, 'after_delete')
+def _remove_follow(mapper, connection, follow):
+    remove_follow(connection, follow.user_id, follow.club_id)
+
+# --- Maintenance ---
+
+def repair_timelines(connection):
+    """Prunes entries behind the horizon and adds any that are missing. Returns (pruned, added)."""
+    pruned = connection.execute(delete(timeline).where(timeline.c.created_at < horizon() - PRUNE_SLACK)).rowcount
+    added = _insert_entries(connection, _entries_select())
+    return pruned, added
+
+def rebuild_timelines(connection):
+    """Recomputes every timeline from posts and follows."""
+    connection.execute(delete(timeline))
+    return _insert_entries(connection, _entries_select())
+
+# --- Read Path ---
+
+def following_page(user_id, followed_club_ids, cursor=None, per_page=FEED_PAGE_SIZE):
+    """Returns (posts, next_cursor) for a page of the following feed."""
+    limit = per_page + 1  # one extra row tells whether another page exists
+    edge = horizon()
+    position = decode_cursor(cursor)
+    posts = []
+
+    if position is None or position[0] >= edge:
+        # Recent posts: the user's timeline, plus large clubs read directly
+        recent = feed_query().join(TimelineEntry, and_(TimelineEntry.post_id == Post.id,
+                                                       TimelineEntry.user_id == user_id))
+        recent = after_cursor(recent, cursor, TimelineEntry.created_at, TimelineEntry.post_id)
+        posts = recent.filter(TimelineEntry.created_at >= edge) \
+            .order_by(TimelineEntry.created_at.desc(), TimelineEntry.post_id.desc()).limit(limit).all()
+
+        pulled_ids = large_club_ids() & set(followed_club_ids)
+        if pulled_ids:
+            pulled = after_cursor(feed_query(), cursor).filter(Post.club_id.in_(pulled_ids), Post.created_at >= edge)
+            posts += pulled.order_by(Post.created_at.desc(), Post.id.desc()).limit(limit).all()
+            # A club that grew past FANOUT_LIMIT can still have timeline entries
+            posts = sorted({post.id: post for post in posts}.values(),
+                           key=lambda post: (post.created_at, post.id), reverse=True)[:limit]
+
+    if len(posts) < limit and followed_club_ids:
+        # Past the horizon: read older posts straight from the followed clubs
+        older = feed_query().filter(Post.club_id.in_(list(followed_club_ids)), Post.created_at < edge)
+        posts += after_cursor(older, cursor).order_by(Post.created_at.desc(), Post.id.desc()) \
+            .limit(limit - len(posts)).all()
+
+    return split_page(posts, per_page)
@@ -0,0 +1,53 @@
+# user_context.py
+# Per-user context, cached under the user's tag: the identity Flask-Login
+# needs (email, role) plus the ids behind the RSVP, follow and like buttons,
+# as compact IdSets (see idset.py).
+#
+#   context = user_context(user_id)   # {'id', 'email', 'role', 'rsvps', 'follows', 'likes'}
+#
+# In the steady state an authenticated request runs no identity queries:
+# load_user() rebuilds the User from the cached context and attaches it to
+# the session without a SELECT (relationships such as user.club still load
+# lazily when used). invalidate(user_tag(id)) rebuilds the context; the
+# toggle routes, the club follower removal and the admin role edit and
+# delete all do that. A deleted user caches as None, i.e. logged out.
+from sqlalchemy import select
+from sqlalchemy.orm import make_transient_to_detached
+from extensions import db
+from models import User, RSVP, ClubFollower, PostLike
+from caching import get_or_build, user_tag
+from idset import IdSet
+
+def user_context(user_id):
+    """The cached context for `user_id`, or None if there is no such user."""
+    def build():
+        identity = db.session.execute(select(User.email, User.role).where(User.id == user_id)).first()
+        if identity is None:
+            return None, []
+        return {
+            'id': user_id,
+            'email': identity.email,
+            'role': identity.role,
+            # Column-only queries, already sorted for IdSet: no ORM object per RSVP, follow or like
+            'rsvps': IdSet(db.session.scalars(
+                select(RSVP.post_id).where(RSVP.user_id == user_id).order_by(RSVP.post_id))),
+            'follows': IdSet(db.session.scalars(
+                select(ClubFollower.club_id).where(ClubFollower.user_id == user_id).order_by(ClubFollower.club_id))),
+            'likes': IdSet(db.session.scalars(
+                select(PostLike.post_id).where(PostLike.user_id == user_id).order_by(PostLike.post_id))),
+        }, []
+
+    return get_or_build(f'user_context:{user_id}', [user_tag(user_id)], build)
+
+def load_user(user_id):
+    """Flask-Login user loader backed by user_context()."""
+    user = db.session.identity_map.get(db.session.identity_key(User, user_id))
+    if user is not None:
+        return user
+    context = user_context(user_id)
+    if context is None:
+        return None
+    user = User(id=context['id'], email=context['email'], role=context['role'])
+    make_transient_to_detached(user)  # persistent identity, no INSERT; other columns load on access
+    db.session.add(user)
+    return user